@@ -0,0 +1,42 @@
+# SPDX-FileCopyrightText: 2025 Joe Pardue
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`as7343._frame`
+================================================================================
+
+Helpers shared by the processing modules for converting between the two frame
+shapes the driver produces: the label dictionary returned by
+:meth:`~as7343.AS7343.read_all` and the ordered list returned by
+:attr:`~as7343.AS7343.channels`.
+
+* Author(s): Joe Pardue
+"""
+
+from . import CHANNEL_LABELS
+
+#: Number of spectral channels in a standard frame
+CHANNEL_COUNT = len(CHANNEL_LABELS)
+
+
+def frame_values(frame, out=None, labels=CHANNEL_LABELS):
+    """
+    Copy a frame's channel values into a sequence in ``labels`` order.
+
+    :param frame: Dictionary of channel labels to values, or a sequence that is
+        already in ``labels`` order
+    :param out: Optional preallocated list or array to fill; a new list is
+        created when omitted
+    :param labels: Channel order to use (default: :data:`~as7343.CHANNEL_LABELS`)
+    :return: ``out`` filled with the channel values (missing channels read as 0)
+    """
+    if out is None:
+        out = [0] * len(labels)
+    if isinstance(frame, dict):
+        for i, label in enumerate(labels):
+            out[i] = frame.get(label, 0)
+    else:
+        for i in range(len(labels)):
+            out[i] = frame[i]
+    return out
@@ -0,0 +1,166 @@
+# SPDX-FileCopyrightText: 2025 Joe Pardue
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`as7343.acquisition`
+================================================================================
+
+Double-buffered acquisition that overlaps host processing with integration.
+
+``read_all()`` leaves the sensor idle while the caller processes a frame.
+:class:`DoubleBufferedReader` instead starts the next integration as soon as a
+cycle's data has been read, then hands the finished frame to the caller. Two
+preallocated frame dictionaries alternate: while the caller works on one, the
+next frame is collected into the other.
+
+With a single-cycle plan (channels within one SMUX mode, see
+:mod:`as7343.smux`) the frame rate becomes max(integration, processing) instead
+of their sum. Full 13-channel frames need three SMUX cycles with the host
+between each, so only the first cycle of the next frame overlaps processing;
+use :meth:`poll` from the processing loop to advance the other cycles as they
+finish.
+
+* Author(s): Joe Pardue
+"""
+
+import time
+
+from . import SMUX_VISIBLE, SMUX_NIR, SMUX_FZF5
+
+
+class DoubleBufferedReader:
+    """
+    Read frames continuously into two alternating buffers.
+
+    A returned frame stays valid until the next frame after it completes, so
+    the caller must finish with (or copy) it before reading twice more.
+
+    :param sensor: The :class:`~as7343.AS7343` to read from
+    :param plan: Sequence of (SMUX mode or image, label_map) steps making up a
+        frame, such as ``SmuxPlanner(sensor).plan(labels)`` (default: the
+        three built-in modes)
+    :param float timeout: Extra seconds to wait for data after the
+        integration time has elapsed (default: 0.5)
+    :raises ValueError: If the plan is empty
+    """
+
+    def __init__(self, sensor, plan=None, timeout=0.5):
+        if plan is None:
+            plan = tuple(
+                (mode, sensor.get_smux_map(mode))
+                for mode in (SMUX_VISIBLE, SMUX_NIR, SMUX_FZF5)
+            )
+        if not plan:
+            raise ValueError("The plan needs at least one step.")
+        self._sensor = sensor
+        self._plan = tuple(plan)
+        self._timeout_ns = int(timeout * 1e9)
+        self._buffers = ({}, {})
+        self._front = 0
+        self._step = 0
+        self._started = 0  # Start of the running integration, 0 when stopped
+        self._cycle_ns = 0
+        self._frames = 0
+
+    def _begin(self, step):
+        """Load the SMUX for a step (if it changes) and start integrating."""
+        sensor = self._sensor
+        if len(self._plan) > 1 or not self._started:
+            sensor.load_smux(self._plan[step][0])
+        sensor.start_measurement()
+        self._step = step
+        self._cycle_ns = int(sensor.cycle_time * 1e9)
+        self._started = time.monotonic_ns()
+
+    def _collect(self):
+        """Read the finished cycle, start the next one and return a complete frame."""
+        sensor = self._sensor
+        sensor.stop_measurement()
+        back = self._buffers[1 - self._front]
+        sensor.read_channels(self._plan[self._step][1], back)
+        step = self._step + 1
+        if step < len(self._plan):
+            self._begin(step)
+            return None
+        self._begin(0)
+        self._front = 1 - self._front
+        self._frames += 1
+        return back
+
+    def start(self):
+        """Start the first integration if acquisition is not running."""
+        if not self._started:
+            self._begin(0)
+
+    def stop(self):
+        """Stop acquisition; a partly collected frame is discarded."""
+        if self._started:
+            self._sensor.stop_measurement()
+            self._started = 0
+
+    def poll(self):
+        """
+        Advance acquisition without blocking.
+
+        Reads the running cycle if its integration has finished and starts the
+        next one. Starts acquisition if it is not running.
+
+        :return: The completed frame, or None if no frame completed
+        """
+        if not self._started:
+            self._begin(0)
+            return None
+        if time.monotonic_ns() - self._started < self._cycle_ns:
+            return None
+        if not self._sensor.data_ready:
+            if time.monotonic_ns() - self._started < self._cycle_ns + self._timeout_ns:
+                return None
+        return self._collect()
+
+    def read(self):
+        """
+        Block until the next frame completes.
+
+        :return: Dictionary of channel labels mapping to values
+        """
+        self.start()
+        sensor = self._sensor
+        while True:
+            remaining = self._started + self._cycle_ns - time.monotonic_ns()
+            if remaining > 0:
+                time.sleep(remaining / 1e9)
+            deadline = time.monotonic_ns() + self._timeout_ns
+            while not sensor.data_ready and time.monotonic_ns() < deadline:
+                time.sleep(0.001)
+            frame = self._collect()
+            if frame is not None:
+                return frame
+
+    @property
+    def latest(self):
+        """
+        The most recently completed frame.
+
+        :return: Dictionary of channel labels mapping to values (empty before
+            the first frame)
+        """
+        return self._buffers[self._front]
+
+    @property
+    def frames(self):
+        """
+        The number of frames completed since construction.
+
+        :return: Frame count
+        """
+        return self._frames
+
+    @property
+    def running(self):
+        """
+        Whether an integration is in progress.
+
+        :return: True while acquiring
+        """
+        return bool(self._started)
@@ -0,0 +1,352 @@
+# SPDX-FileCopyrightText: 2025 Joe Pardue
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`as7343.batch`
+================================================================================
+
+Chunked, vectorized post-processing of large recorded datasets (CPython with
+numpy).
+
+:func:`iter_chunks` reads a log written by :class:`~as7343.export.FrameExporter`
+(CSV, NDJSON or binary) in fixed-size chunks of frames, each holding an
+``n x 13`` channel array plus timestamp, gain and integration time columns.
+:class:`BatchProcessor` applies dark subtraction, normalization, calibration
+and colorimetry to a whole chunk with array operations, and
+:meth:`BatchProcessor.process_file` streams a log through it into a CSV file.
+Memory use is bounded by the chunk size (times the number of workers when a
+process pool is used), whatever the length of the log.
+
+Normalization divides by the gain factor and the integration time in
+milliseconds, giving counts per millisecond at 1x gain, so frames taken with
+different settings become comparable.
+
+* Author(s): Joe Pardue
+"""
+
+import itertools
+import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from . import CHANNEL_LABELS, GAIN_4X
+from .export import BINARY_SYNC
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+#: Output columns of colorimetry, after the channel columns
+COLOR_COLUMNS = ("X", "Y", "Z", "x", "y", "CCT")
+
+
+def _require_numpy():
+    """Raise if numpy is not available."""
+    if np is None:
+        raise RuntimeError("Batch processing requires numpy.")
+
+
+def _gain_factors(gain):
+    """Return the gain multipliers of an array of GAIN_* settings."""
+    gain = np.asarray(gain, dtype=np.float64)
+    return np.where(gain == 0, 0.5, np.exp2(gain - 1))
+
+
+def _sniff(stream):
+    """Return the format of a log opened in binary mode."""
+    start = stream.tell()
+    head = stream.read(2)
+    stream.seek(start)
+    if head == BINARY_SYNC:
+        return "BINARY"
+    if head[:1] == b"{":
+        return "NDJSON"
+    return "CSV"
+
+
+def _read_lines(stream, count):
+    """Read up to count non-blank lines."""
+    return [line for line in itertools.islice(stream, count) if line.strip()]
+
+
+def _unwrap(chunk, last):
+    """
+    Unwrap the 32-bit millisecond timestamps of a chunk in place.
+
+    :param last: Unwrapped timestamp of the previous frame, or None
+    :return: Unwrapped timestamp of the last frame of the chunk
+    """
+    stamps = chunk["t"]
+    if last is None:
+        first = stamps[0]
+    else:
+        first = last + ((int(stamps[0]) - last) & 0xFFFFFFFF)
+    deltas = np.diff(stamps) & 0xFFFFFFFF
+    stamps[0] = first
+    stamps[1:] = first + np.cumsum(deltas)
+    return int(stamps[-1])
+
+
+def _empty_chunk(count, channels, gain, integration_time):
+    """Allocate the arrays of one chunk."""
+    return {
+        "t": np.zeros(count, dtype=np.int64),
+        "values": np.zeros((count, channels), dtype=np.float64),
+        "gain": np.full(count, gain, dtype=np.int64),
+        "integration_time": np.full(count, integration_time, dtype=np.float64),
+    }
+
+
+def iter_chunks(
+    path,
+    chunk_size=65536,
+    labels=CHANNEL_LABELS,
+    gain=GAIN_4X,
+    integration_time=150000,
+):
+    """
+    Read a recorded log in chunks of frames.
+
+    CSV logs may carry extra ``gain`` and ``integration_time`` columns and
+    NDJSON records the matching keys; otherwise the defaults are used.
+    Timestamps are unwrapped where the exporter's 32-bit millisecond counter
+    rolls over, so they keep increasing across the whole log.
+
+    :param str path: Path of a CSV, NDJSON or binary log
+    :param int chunk_size: Frames per chunk (default: 65536)
+    :param labels: Channel order of the ``values`` columns, and of the
+        records in binary logs (default: CHANNEL_LABELS)
+    :param gain: Gain of frames without one (default: GAIN_4X)
+    :param integration_time: Integration time in microseconds of frames
+        without one (default: 150000)
+    :return: Iterator of dictionaries with ``t`` (ms), ``values`` (n x
+        channels), ``gain`` and ``integration_time`` (us) arrays
+    :raises RuntimeError: If numpy is not available
+    """
+    _require_numpy()
+    last = None
+    for chunk in _read_chunks(path, chunk_size, tuple(labels), gain, integration_time):
+        last = _unwrap(chunk, last)
+        yield chunk
+
+
+def _read_chunks(path, chunk_size, labels, gain, integration_time):
+    """Yield the chunks of a log with the timestamps as recorded."""
+    with open(path, "rb") as stream:
+        fmt = _sniff(stream)
+        if fmt == "BINARY":
+            record = np.dtype(
+                [
+                    ("sync", "S2"),
+                    ("seq", "<u2"),
+                    ("t", "<u4"),
+                    ("values", "<u2", (len(labels),)),
+                ]
+            )
+            while True:
+                data = stream.read(chunk_size * record.itemsize)
+                count = len(data) // record.itemsize
+                if not count:
+                    return
+                records = np.frombuffer(data, dtype=record, count=count)
+                if np.any(records["sync"] != BINARY_SYNC):
+                    raise ValueError("Lost sync in binary log.")
+                chunk = _empty_chunk(count, len(labels), gain, integration_time)
+                chunk["t"][:] = records["t"]
+                chunk["values"][:] = records["values"]
+                yield chunk
+        elif fmt == "NDJSON":
+            while True:
+                lines = _read_lines(stream, chunk_size)
+                if not lines:
+                    return
+                chunk = _empty_chunk(len(lines), len(labels), gain, integration_time)
+                values = chunk["values"]
+                for row, line in enumerate(lines):
+                    record = json.loads(line)
+                    chunk["t"][row] = record.get("t", 0)
+                    chunk["gain"][row] = record.get("gain", gain)
+                    chunk["integration_time"][row] = record.get(
+                        "integration_time", integration_time
+                    )
+                    for column, label in enumerate(labels):
+                        values[row, column] = record.get(label, 0)
+                yield chunk
+        else:
+            columns = stream.readline().decode().strip().split(",")
+            index = {name: i for i, name in enumerate(columns)}
+            while True:
+                lines = _read_lines(stream, chunk_size)
+                if not lines:
+                    return
+                table = np.loadtxt(lines, delimiter=",", ndmin=2)
+                chunk = _empty_chunk(len(table), len(labels), gain, integration_time)
+                if "t_ms" in index:
+                    chunk["t"][:] = table[:, index["t_ms"]]
+                for name in ("gain", "integration_time"):
+                    if name in index:
+                        chunk[name][:] = table[:, index[name]]
+                for column, label in enumerate(labels):
+                    if label in index:
+                        chunk["values"][:, column] = table[:, index[label]]
+                yield chunk
+
+
+class BatchProcessor:
+    """
+    Vectorized dark subtraction, normalization, calibration and colorimetry.
+
+    Steps run in that order and each is skipped when not configured.
+
+    :param dark: Dark counts to subtract, as a sequence in ``labels`` order or
+        a dictionary (raw counts, before normalization)
+    :param bool normalize: Convert to counts per millisecond at 1x gain
+        (default: True)
+    :param calibration: Per-channel correction factors (sequence or
+        dictionary), or a square channels x channels correction matrix
+    :param xyz_matrix: 3 x channels matrix mapping (calibrated) channels to
+        CIE XYZ; enables the X, Y, Z, x, y and CCT columns
+    :param labels: Channel order (default: CHANNEL_LABELS)
+    :raises RuntimeError: If numpy is not available
+    :raises ValueError: If a matrix or vector has the wrong shape
+    """
+
+    def __init__(
+        self,
+        dark=None,
+        normalize=True,
+        calibration=None,
+        xyz_matrix=None,
+        labels=CHANNEL_LABELS,
+    ):
+        _require_numpy()
+        self._labels = tuple(labels)
+        channels = len(self._labels)
+        self._dark = None if dark is None else self._vector(dark, 0.0)
+        self._normalize = normalize
+        self._calibration = None
+        if calibration is not None:
+            if isinstance(calibration, dict) or np.ndim(calibration) == 1:
+                self._calibration = self._vector(calibration, 1.0)
+            else:
+                self._calibration = np.asarray(calibration, dtype=np.float64)
+                if self._calibration.shape != (channels, channels):
+                    raise ValueError("Calibration matrix must be channels x channels.")
+        self._xyz = None
+        if xyz_matrix is not None:
+            self._xyz = np.asarray(xyz_matrix, dtype=np.float64)
+            if self._xyz.shape != (3, channels):
+                raise ValueError("XYZ matrix must be 3 x channels.")
+
+    def _vector(self, values, default):
+        """Return a per-channel vector from a sequence or dictionary."""
+        if isinstance(values, dict):
+            values = [values.get(label, default) for label in self._labels]
+        vector = np.asarray(values, dtype=np.float64)
+        if vector.shape != (len(self._labels),):
+            raise ValueError("Expected one value per channel.")
+        return vector
+
+    @property
+    def columns(self):
+        """
+        The names of the output columns written by process_file().
+
+        :return: Tuple of column names
+        """
+        columns = ("t_ms",) + self._labels
+        if self._xyz is not None:
+            columns += COLOR_COLUMNS
+        return columns
+
+    def process(self, chunk):
+        """
+        Process one chunk.
+
+        :param chunk: Dictionary from iter_chunks()
+        :return: Dictionary with ``t`` and processed ``values`` arrays, plus
+            ``xyz`` (n x 3), ``xy`` (n x 2) and ``cct`` (n) with colorimetry;
+            ``xy`` and ``cct`` are NaN for frames without light (XYZ sum of 0)
+        """
+        values = np.array(chunk["values"], dtype=np.float64)
+        if self._dark is not None:
+            values -= self._dark
+            np.maximum(values, 0.0, out=values)
+        if self._normalize:
+            scale = _gain_factors(chunk["gain"]) * (
+                np.asarray(chunk["integration_time"], dtype=np.float64) / 1000
+            )
+            values /= scale[:, None]
+        if self._calibration is not None:
+            if self._calibration.ndim == 1:
+                values *= self._calibration
+            else:
+                values = values @ self._calibration.T
+        result = {"t": chunk["t"], "values": values}
+        if self._xyz is not None:
+            xyz = values @ self._xyz.T
+            total = xyz.sum(axis=1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                xy = np.where(total[:, None] > 0, xyz[:, :2] / total[:, None], np.nan)
+                # McCamy's approximation of the correlated color temperature
+                n = (xy[:, 0] - 0.3320) / (0.1858 - xy[:, 1])
+            result["xyz"] = xyz
+            result["xy"] = xy
+            result["cct"] = 449 * n**3 + 3525 * n**2 + 6823.3 * n + 5520.33
+        return result
+
+    def table(self, result):
+        """
+        Combine a processed chunk into one array with the output columns.
+
+        :param result: Dictionary from process()
+        :return: n x len(columns) array
+        """
+        parts = [np.asarray(result["t"], dtype=np.float64)[:, None], result["values"]]
+        if "xyz" in result:
+            parts += [result["xyz"], result["xy"], result["cct"][:, None]]
+        return np.hstack(parts)
+
+    def _process_table(self, chunk):
+        """Process a chunk into an output table (runs in pool workers)."""
+        return self.table(self.process(chunk))
+
+    def process_file(self, source, destination, chunk_size=65536, workers=None, **log):
+        """
+        Stream a recorded log through the processor into a CSV file.
+
+        :param str source: Path of the recorded log
+        :param str destination: Path of the CSV file to write
+        :param int chunk_size: Frames per chunk (default: 65536)
+        :param workers: Number of worker processes, or None to process in this
+            process (default: None)
+        :param log: Extra keyword arguments for iter_chunks(), such as the
+            default gain and integration time
+        :return: Number of frames processed
+        """
+        chunks = iter_chunks(source, chunk_size, self._labels, **log)
+        frames = 0
+        formats = ["%d"] + ["%.6g"] * (len(self.columns) - 1)  # Exact t_ms
+        with open(destination, "w", encoding="utf-8") as output:
+            output.write(",".join(self.columns) + "\n")
+            for table in self._tables(chunks, workers):
+                np.savetxt(output, table, delimiter=",", fmt=formats)
+                frames += len(table)
+        return frames
+
+    def _tables(self, chunks, workers):
+        """Yield output tables in order, keeping a bounded number in flight."""
+        if not workers:
+            for chunk in chunks:
+                yield self._process_table(chunk)
+            return
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(self._process_table, chunk))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
@@ -0,0 +1,233 @@
+# SPDX-FileCopyrightText: 2025 Joe Pardue
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`as7343.change`
+================================================================================
+
+Change-driven output for expensive links (LoRa, BLE, cellular).
+
+:class:`ChangeDetector` compares each frame with the last frame it let through
+and only passes frames that differ meaningfully, plus a periodic heartbeat so
+the receiver knows the node is alive. A change is either:
+
+* a channel leaving its **dead-band** around the last emitted value, which is
+  the larger of an absolute band (counts) and a relative band (fraction of the
+  emitted value), or
+* a **spectral distance** above a threshold: the Euclidean distance between the
+  two spectra scaled to unit length, which ignores overall brightness and
+  reacts to changes in spectral shape only (0 for the same shape, up to
+  sqrt(2)).
+
+Each frame is checked in one pass over the channels into preallocated storage,
+so filtering allocates nothing. Suppression statistics show how much traffic
+the filter saves.
+
+* Author(s): Joe Pardue
+"""
+
+import math
+import time
+
+from . import CHANNEL_LABELS
+from ._frame import frame_values
+
+CHANGE = "CHANGE"  #: Frame passed because it changed (or is the first frame)
+HEARTBEAT = "HEARTBEAT"  #: Frame passed because the heartbeat was due
+
+
+def _per_channel(value, labels, name):
+    """Expand a scalar, sequence or dictionary into a list in label order."""
+    if value is None:
+        return [0] * len(labels)
+    if isinstance(value, dict):
+        for label in value:
+            if label not in labels:
+                raise ValueError(f"Unknown channel: {label}")
+        values = [value.get(label, 0) for label in labels]
+    elif isinstance(value, (int, float)):
+        values = [value] * len(labels)
+    else:
+        values = list(value)
+        if len(values) != len(labels):
+            raise ValueError(f"Expected one {name} value per channel.")
+    if any(v < 0 for v in values):
+        raise ValueError(f"The {name} dead-band must not be negative.")
+    return values
+
+
+class ChangeDetector:
+    """
+    Pass only frames that changed significantly since the last passed frame.
+
+    Dead-bands and the distance threshold can be combined; a frame passes if
+    any configured criterion is exceeded. With neither configured, any
+    difference at all passes.
+
+    :param absolute: Absolute dead-band in counts, as one value for all
+        channels, a sequence in ``labels`` order or a dictionary by label
+    :param relative: Relative dead-band as a fraction of the last emitted
+        value, in the same forms as ``absolute``
+    :param distance: Spectral distance threshold (0 to sqrt(2)), or None
+    :param heartbeat: Pass a frame at least this often, in seconds, even
+        without a change (default: None, no heartbeat)
+    :param labels: Channel labels, in frame order (default: CHANNEL_LABELS)
+    :raises ValueError: If a dead-band is negative or malformed, a label is
+        unknown, or the distance or heartbeat is not positive
+    """
+
+    def __init__(
+        self,
+        absolute=None,
+        relative=None,
+        distance=None,
+        heartbeat=None,
+        labels=CHANNEL_LABELS,
+    ):
+        if distance is not None and distance <= 0:
+            raise ValueError("Distance threshold must be positive.")
+        if heartbeat is not None and heartbeat <= 0:
+            raise ValueError("Heartbeat interval must be positive.")
+        self._labels = labels
+        self._size = len(labels)
+        self._deadband = absolute is not None or relative is not None
+        self._absolute = _per_channel(absolute, labels, "absolute")
+        self._relative = _per_channel(relative, labels, "relative")
+        self._distance = distance
+        self._heartbeat_ns = None if heartbeat is None else int(heartbeat * 1e9)
+        self._values = [0] * self._size
+        self._emitted = [0] * self._size
+        self._emitted_ns = 0
+        self._primed = False
+        self._frames = 0
+        self._changes = 0
+        self._heartbeats = 0
+
+    def reset(self):
+        """Clear the statistics and pass the next frame unconditionally."""
+        self._primed = False
+        self._frames = 0
+        self._changes = 0
+        self._heartbeats = 0
+
+    def _changed(self, values):
+        """Check values against the last emitted frame."""
+        emitted = self._emitted
+        if not (self._deadband or self._distance):
+            for i in range(self._size):
+                if values[i] != emitted[i]:
+                    return True
+            return False
+        dot = norm_new = norm_old = 0
+        for i in range(self._size):
+            val = values[i]
+            last = emitted[i]
+            if self._deadband:
+                band = self._relative[i] * abs(last)
+                if band < self._absolute[i]:
+                    band = self._absolute[i]
+                if abs(val - last) > band:
+                    return True
+            dot += val * last
+            norm_new += val * val
+            norm_old += last * last
+        if self._distance is None:
+            return False
+        if not norm_new or not norm_old:
+            return norm_new != norm_old
+        # |a/|a| - b/|b||^2 = 2 - 2 cos(a, b)
+        cosine = dot / math.sqrt(norm_new * norm_old)
+        return 2 - 2 * cosine > self._distance * self._distance
+
+    def update(self, frame, timestamp_ns=None):
+        """
+        Check one frame.
+
+        :param frame: Dictionary from read_all() or a sequence in ``labels``
+            order
+        :param timestamp_ns: Frame time from ``time.monotonic_ns()`` for the
+            heartbeat (default: now)
+        :return: CHANGE or HEARTBEAT if the frame should be sent, otherwise
+            None
+        """
+        if timestamp_ns is None and self._heartbeat_ns is not None:
+            timestamp_ns = time.monotonic_ns()
+        values = frame_values(frame, self._values, self._labels)
+        self._frames += 1
+        if not self._primed or self._changed(values):
+            self._primed = True
+            reason = CHANGE
+            self._changes += 1
+        elif (
+            self._heartbeat_ns is not None
+            and timestamp_ns - self._emitted_ns >= self._heartbeat_ns
+        ):
+            reason = HEARTBEAT
+            self._heartbeats += 1
+        else:
+            return None
+        emitted = self._emitted
+        for i in range(self._size):
+            emitted[i] = values[i]
+        if timestamp_ns is not None:
+            self._emitted_ns = timestamp_ns
+        return reason
+
+    @property
+    def emitted(self):
+        """
+        The values of the last passed frame.
+
+        The list is updated in place by update(); copy it if it must be kept.
+
+        :return: List in ``labels`` order
+        """
+        return self._emitted
+
+    @property
+    def frames(self):
+        """
+        The number of frames checked.
+
+        :return: Frame count
+        """
+        return self._frames
+
+    @property
+    def changes(self):
+        """
+        The number of frames passed because they changed.
+
+        :return: Frame count
+        """
+        return self._changes
+
+    @property
+    def heartbeats(self):
+        """
+        The number of frames passed as heartbeats.
+
+        :return: Frame count
+        """
+        return self._heartbeats
+
+    @property
+    def suppressed(self):
+        """
+        The number of frames held back.
+
+        :return: Frame count
+        """
+        return self._frames - self._changes - self._heartbeats
+
+    @property
+    def suppression_ratio(self):
+        """
+        The fraction of checked frames that were held back.
+
+        :return: Ratio from 0 to 1
+        """
+        if not self._frames:
+            return 0.0
+        return self.suppressed / self._frames
@@ -0,0 +1,498 @@
+# SPDX-FileCopyrightText: 2025 Joe Pardue
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`as7343.daemon`
+================================================================================
+
+Shared-memory acquisition for several local consumers (CPython on Linux).
+
+Only one process can own the I2C bus, so :class:`AcquisitionDaemon` owns one or
+more sensors and publishes every frame into a ring buffer in shared memory.
+Consumers attach with :class:`FrameReader` and read frames straight out of the
+shared buffer, so adding a consumer costs no bus traffic and no copies through
+the daemon.
+
+Each ring slot is guarded by a sequence number (a seqlock): the writer marks
+the slot odd while filling it and stores the frame number when done, and a
+reader accepts a slot only if the number is the one it expects before and
+after reading. A reader that falls more than a ring behind skips ahead and
+counts the lost frames.
+
+Configuration changes go through a Unix socket speaking newline-delimited JSON
+(see :func:`send_command`) and are applied by the daemon between frames, so the
+bus is never shared.
+
+Shared memory layout (little endian)::
+
+    header  4s magic "AS73", H version, H slots, H channels, H sensors, 4x,
+            Q last published frame number
+    slot    Q sequence, Q timestamp_ns, I integration_time_us, H sensor,
+            H gain, then one float64 per channel
+
+* Author(s): Joe Pardue
+"""
+
+import json
+import os
+import select
+import socket
+import struct
+import time
+from multiprocessing import shared_memory
+
+from . import CHANNEL_LABELS
+from ._frame import frame_values
+
+DEFAULT_NAME = "as7343"  #: Default shared memory name
+DEFAULT_CONTROL_PATH = "/tmp/as7343.sock"  #: Default control socket path
+
+_MAGIC = b"AS73"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHHHH4xQ")
+_LATEST_OFFSET = 16
+_SLOT_HEADER = struct.Struct("<QQIHH")
+
+#: Sensor properties that can be changed over the control socket
+SETTABLE = (
+    "gain",
+    "integration_time",
+    "wait_time",
+    "auto_zero_frequency",
+    "dark_subtraction",
+)
+
+
+def _attach(name):
+    """Attach to existing shared memory without registering it for cleanup."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        return shared_memory.SharedMemory(name=name)
+
+
+class AcquisitionDaemon:
+    """
+    Own one or more sensors and publish their frames to shared memory.
+
+    :param sensors: An :class:`~as7343.AS7343` or a sequence of them
+    :param str name: Shared memory name (default: DEFAULT_NAME)
+    :param int slots: Ring buffer capacity in frames (default: 64)
+    :param str control_path: Unix socket path for configuration commands, or
+        None to disable the control channel (default: DEFAULT_CONTROL_PATH)
+    :param labels: Channel labels to publish (default: CHANNEL_LABELS)
+    :raises ValueError: If no sensors are given or slots is out of range
+    """
+
+    def __init__(
+        self,
+        sensors,
+        name=DEFAULT_NAME,
+        slots=64,
+        control_path=DEFAULT_CONTROL_PATH,
+        labels=CHANNEL_LABELS,
+    ):
+        if not isinstance(sensors, (list, tuple)):
+            sensors = (sensors,)
+        if not sensors:
+            raise ValueError("At least one sensor is required.")
+        if slots not in range(1, 65536):
+            raise ValueError("Slots must be between 1 and 65535.")
+        self._sensors = tuple(sensors)
+        self._labels = tuple(labels)
+        self._slots = slots
+        self._slot_size = _SLOT_HEADER.size + 8 * len(labels)
+        self._values = [0.0] * len(labels)
+        self._frame = 0
+        self._errors = [0] * len(self._sensors)
+        self._running = False
+        self._shm = shared_memory.SharedMemory(
+            name=name, create=True, size=_HEADER.size + slots * self._slot_size
+        )
+        _HEADER.pack_into(
+            self._shm.buf,
+            0,
+            _MAGIC,
+            _VERSION,
+            slots,
+            len(labels),
+            len(self._sensors),
+            0,
+        )
+        self._control_path = control_path
+        self._server = None
+        self._clients = {}
+        if control_path is not None:
+            if os.path.exists(control_path):
+                os.unlink(control_path)
+            self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._server.bind(control_path)
+            self._server.listen()
+            self._server.setblocking(False)
+
+    @property
+    def name(self):
+        """
+        The shared memory name readers attach to.
+
+        :return: Shared memory name
+        """
+        return self._shm.name
+
+    @property
+    def frames(self):
+        """
+        The number of frames published.
+
+        :return: Frame count
+        """
+        return self._frame
+
+    @property
+    def errors(self):
+        """
+        The number of failed reads of each sensor.
+
+        A sensor whose read_all() fails (after its own retries and recovery)
+        is skipped for that round and the others keep publishing.
+
+        :return: List of counts, one per sensor
+        """
+        return self._errors
+
+    def publish(self, sensor_index, frame, timestamp_ns=None):
+        """
+        Write one frame into the next ring slot.
+
+        :param int sensor_index: Index of the sensor the frame came from
+        :param frame: Dictionary of channel labels to values, or a sequence in
+            label order
+        :param timestamp_ns: Acquisition time (default: ``time.monotonic_ns()``)
+        :return: The frame number assigned
+        """
+        if timestamp_ns is None:
+            timestamp_ns = time.monotonic_ns()
+        sensor = self._sensors[sensor_index]
+        number = self._frame + 1
+        buf = self._shm.buf
+        offset = _HEADER.size + (number % self._slots) * self._slot_size
+        _SLOT_HEADER.pack_into(
+            buf,
+            offset,
+            (number << 1) | 1,
+            timestamp_ns,
+            int(sensor.integration_time),
+            sensor_index,
+            sensor.gain,
+        )
+        frame_values(frame, self._values, self._labels)
+        struct.pack_into(
+            f"<{len(self._labels)}d",
+            buf,
+            offset + _SLOT_HEADER.size,
+            *self._values,
+        )
+        struct.pack_into("<Q", buf, offset, number << 1)
+        struct.pack_into("<Q", buf, _LATEST_OFFSET, number)
+        self._frame = number
+        return number
+
+    def step(self):
+        """
+        Read one frame from every sensor, publish them and serve commands.
+
+        Frames are stamped with the sensor's frame_timestamp, the time they
+        were measured rather than published. A failing sensor does not stop
+        the others: its frame is skipped for this round and counted in errors.
+        """
+        for index, sensor in enumerate(self._sensors):
+            try:
+                frame = sensor.read_all()
+            except (OSError, RuntimeError):
+                self._errors[index] += 1
+            else:
+                self.publish(index, frame, sensor.frame_timestamp)
+            self.serve(0)
+
+    def run(self, count=None):
+        """
+        Acquire and publish frames until stopped.
+
+        :param count: Number of rounds over all sensors (default: until a
+            ``stop`` command or stop() is called)
+        """
+        self._running = True
+        rounds = 0
+        while self._running and (count is None or rounds < count):
+            self.step()
+            rounds += 1
+
+    def stop(self):
+        """Make run() return after the current round."""
+        self._running = False
+
+    def serve(self, timeout=0):
+        """
+        Accept control connections and answer pending commands.
+
+        :param float timeout: Seconds to wait for activity (default: 0)
+        """
+        if self._server is None:
+            return
+        readable, _, _ = select.select(
+            [self._server] + list(self._clients), [], [], timeout
+        )
+        for sock in readable:
+            if sock is self._server:
+                client, _ = self._server.accept()
+                client.setblocking(False)
+                self._clients[client] = b""
+                continue
+            try:
+                data = sock.recv(4096)
+            except OSError:
+                data = b""
+            if not data:
+                self._drop_client(sock)
+                continue
+            pending = self._clients[sock] + data
+            while b"\n" in pending:
+                line, pending = pending.split(b"\n", 1)
+                reply = self._handle(line)
+                try:
+                    sock.sendall(json.dumps(reply).encode() + b"\n")
+                except OSError:
+                    self._drop_client(sock)
+                    break
+            else:
+                self._clients[sock] = pending
+
+    def _drop_client(self, sock):
+        """Close a control connection."""
+        self._clients.pop(sock, None)
+        sock.close()
+
+    def _handle(self, line):
+        """Run one JSON command and return the reply."""
+        try:
+            command = json.loads(line)
+            action = command.get("cmd")
+            if action == "info":
+                return {
+                    "ok": True,
+                    "name": self._shm.name,
+                    "slots": self._slots,
+                    "labels": list(self._labels),
+                    "sensors": len(self._sensors),
+                    "frames": self._frame,
+                    "errors": self._errors,
+                }
+            if action == "stop":
+                self.stop()
+                return {"ok": True}
+            sensor = self._sensors[command.get("sensor", 0)]
+            if action == "get":
+                return {"ok": True, **{key: getattr(sensor, key) for key in SETTABLE}}
+            if action == "set":
+                for key, value in command.items():
+                    if key in ("cmd", "sensor"):
+                        continue
+                    if key not in SETTABLE:
+                        raise ValueError(f"Setting not allowed: {key}")
+                    setattr(sensor, key, value)
+                return {"ok": True}
+            raise ValueError(f"Unknown command: {action}")
+        except (
+            ValueError,
+            TypeError,
+            IndexError,
+            AttributeError,
+            OSError,  # Bus failure that outlasted the driver's retries
+            RuntimeError,
+        ) as error:
+            return {"ok": False, "error": str(error)}
+
+    def close(self):
+        """Stop serving, close connections and remove the shared memory."""
+        for sock in list(self._clients):
+            self._drop_client(sock)
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+            if os.path.exists(self._control_path):
+                os.unlink(self._control_path)
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+
+class FrameReader:
+    """
+    Read frames published by an :class:`AcquisitionDaemon`.
+
+    :param str name: Shared memory name (default: DEFAULT_NAME)
+    :raises ValueError: If the shared memory does not hold an AS7343 ring
+    """
+
+    def __init__(self, name=DEFAULT_NAME):
+        self._shm = _attach(name)
+        magic, version, slots, channels, sensors, _ = _HEADER.unpack_from(
+            self._shm.buf, 0
+        )
+        if magic != _MAGIC or version != _VERSION:
+            self._shm.close()
+            raise ValueError(f"Not an AS7343 frame ring: {name}")
+        self._slots = slots
+        self._channels = channels
+        self._sensors = sensors
+        self._slot_size = _SLOT_HEADER.size + 8 * channels
+        self._next = self.latest_number + 1
+        self._lost = 0
+
+    @property
+    def latest_number(self):
+        """
+        The number of the most recently published frame.
+
+        :return: Frame number (0 before the first frame)
+        """
+        return struct.unpack_from("<Q", self._shm.buf, _LATEST_OFFSET)[0]
+
+    @property
+    def lost(self):
+        """
+        Frames overwritten before this reader got to them.
+
+        :return: Frame count
+        """
+        return self._lost
+
+    @property
+    def sensors(self):
+        """
+        The number of sensors the daemon publishes.
+
+        :return: Sensor count
+        """
+        return self._sensors
+
+    def values(self, number):
+        """
+        Return a zero-copy view of a frame's values in the ring.
+
+        The view is only valid until the slot is overwritten; check
+        :meth:`valid` after using it.
+
+        :param int number: Frame number
+        :return: memoryview of float64 values in label order
+        """
+        offset = _HEADER.size + (number % self._slots) * self._slot_size
+        start = offset + _SLOT_HEADER.size
+        return self._shm.buf[start : start + 8 * self._channels].cast("d")
+
+    def valid(self, number):
+        """
+        Check that a frame is still in its slot and completely written.
+
+        :param int number: Frame number
+        :return: True if the slot holds the finished frame
+        """
+        offset = _HEADER.size + (number % self._slots) * self._slot_size
+        return struct.unpack_from("<Q", self._shm.buf, offset)[0] == number << 1
+
+    def read_frame(self, number, out=None):
+        """
+        Copy one frame out of the ring.
+
+        :param int number: Frame number
+        :param out: Optional preallocated list to fill with the values
+        :return: Tuple of (timestamp_ns, sensor, gain, integration_time_us,
+            values), or None if the frame is not (or no longer) available
+        """
+        if out is None:
+            out = [0.0] * self._channels
+        offset = _HEADER.size + (number % self._slots) * self._slot_size
+        buf = self._shm.buf
+        sequence, timestamp_ns, integration_time, sensor, gain = (
+            _SLOT_HEADER.unpack_from(buf, offset)
+        )
+        if sequence != number << 1:
+            return None
+        view = self.values(number)
+        for i in range(self._channels):
+            out[i] = view[i]
+        view.release()
+        if not self.valid(number):
+            return None
+        return timestamp_ns, sensor, gain, integration_time, out
+
+    def read(self, timeout=None, out=None):
+        """
+        Return the next unread frame, waiting for it if necessary.
+
+        :param timeout: Seconds to wait (default: wait forever)
+        :param out: Optional preallocated list to fill with the values
+        :return: Tuple of (number, timestamp_ns, sensor, gain,
+            integration_time_us, values), or None on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            latest = self.latest_number
+            if latest >= self._next:
+                if latest - self._next >= self._slots:
+                    oldest = latest - self._slots + 1
+                    self._lost += oldest - self._next
+                    self._next = oldest
+                number = self._next
+                frame = self.read_frame(number, out)
+                self._next += 1
+                if frame is not None:
+                    return (number,) + frame
+                self._lost += 1
+                continue
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(0.001)
+
+    def close(self):
+        """Detach from the shared memory."""
+        self._shm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+
+def send_command(command, control_path=DEFAULT_CONTROL_PATH, timeout=5.0):
+    """
+    Send one command to a running daemon and return its reply.
+
+    Commands are dictionaries with a ``"cmd"`` key: ``info``, ``get``
+    (optionally with ``"sensor"``), ``set`` with settings from SETTABLE, and
+    ``stop``.
+
+    :param dict command: The command, for example
+        ``{"cmd": "set", "gain": 7, "integration_time": 50000}``
+    :param str control_path: The daemon's control socket path
+    :param float timeout: Seconds to wait for the reply (default: 5.0)
+    :return: Reply dictionary with ``"ok"`` and any results
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(control_path)
+        sock.sendall(json.dumps(command).encode() + b"\n")
+        reply = b""
+        while not reply.endswith(b"\n"):
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            reply += chunk
+    return json.loads(reply)
@@ -0,0 +1,319 @@
+# SPDX-FileCopyrightText: 2025 Joe Pardue
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`as7343.export`
+================================================================================
+
+Bounded-memory streaming of frames to a serial port, USB CDC or file.
+
+:class:`FrameExporter` formats each frame as CSV, NDJSON or a compact binary
+record directly into preallocated byte buffers and queues it for the output
+stream. Nothing grows with the number of frames: when the host reads slower
+than frames are produced, the queue fills and the drop policy decides whether
+to wait, drop the new frame or drop the oldest queued one. Every record carries
+a sequence number, so the host can also see where frames were dropped.
+
+For the drop policies to keep acquisition running the stream should not block,
+for example ``usb_cdc.data`` with ``write_timeout = 0`` or a UART with a short
+timeout; the exporter resends whatever a write did not accept.
+
+Binary records are little endian: the two sync bytes ``A5 73``, a 16-bit
+sequence number, a 32-bit millisecond timestamp and one unsigned 16-bit value
+per channel (see :attr:`FrameExporter.record_format`).
+
+* Author(s): Joe Pardue
+"""
+
+import time
+
+from . import CHANNEL_LABELS
+from ._frame import frame_values
+
+FORMAT_CSV = "CSV"  #: One comma-separated line per frame after a header line
+FORMAT_NDJSON = "NDJSON"  #: One JSON object per line
+FORMAT_BINARY = "BINARY"  #: Fixed-size little-endian records
+
+POLICY_BLOCK = "BLOCK"  #: Wait for the stream to accept data
+POLICY_DROP_NEWEST = "DROP_NEWEST"  #: Discard the frame being written
+POLICY_DROP_OLDEST = "DROP_OLDEST"  #: Discard the oldest queued frame
+
+BINARY_SYNC = b"\xa5\x73"  #: First two bytes of every binary record
+
+_NEWLINE = 0x0A
+_VALUE_WIDTH = 24  # Longest formatted value, including separators
+
+
+def _put_int(buf, pos, value):
+    """Write a decimal integer into buf at pos and return the new position."""
+    if value < 0:
+        buf[pos] = 0x2D
+        pos += 1
+        value = -value
+    start = pos
+    while True:
+        buf[pos] = 0x30 + value % 10
+        pos += 1
+        value //= 10
+        if not value:
+            break
+    end = pos - 1
+    while start < end:
+        buf[start], buf[end] = buf[end], buf[start]
+        start += 1
+        end -= 1
+    return pos
+
+
+def _put_bytes(buf, pos, data):
+    """Copy bytes into buf at pos and return the new position."""
+    end = pos + len(data)
+    buf[pos:end] = data
+    return end
+
+
+def _put_value(buf, pos, value):
+    """Write a channel value as an integer, or a float if it has a fraction."""
+    if isinstance(value, int):
+        return _put_int(buf, pos, value)
+    if value % 1 == 0:
+        return _put_int(buf, pos, int(value))
+    return _put_bytes(buf, pos, ("%.6g" % value).encode())
+
+
+class FrameExporter:
+    """
+    Stream frames in a fixed amount of memory.
+
+    :param stream: Object with a ``write()`` method accepting a buffer and
+        returning the number of bytes written (or None if it wrote all)
+    :param fmt: FORMAT_CSV (default), FORMAT_NDJSON or FORMAT_BINARY
+    :param int buffer_size: Size of the output queue in bytes (default: 1024)
+    :param policy: POLICY_DROP_NEWEST (default), POLICY_DROP_OLDEST or
+        POLICY_BLOCK, applied when the queue is full
+    :param labels: Channel labels to export, in order (default: CHANNEL_LABELS)
+    :param bool header: Write the CSV header line to the stream on creation,
+        waiting until it is accepted (default: True)
+    :param sensor: Sensor whose frame_timestamp stamps frames written without
+        a timestamp, so records carry the measurement time (default: None, the
+        time of the write)
+    :raises ValueError: If the format or policy is unknown, or the queue cannot
+        hold a single record
+    """
+
+    def __init__(
+        self,
+        stream,
+        fmt=FORMAT_CSV,
+        buffer_size=1024,
+        policy=POLICY_DROP_NEWEST,
+        labels=CHANNEL_LABELS,
+        header=True,
+        sensor=None,
+    ):
+        if fmt not in (FORMAT_CSV, FORMAT_NDJSON, FORMAT_BINARY):
+            raise ValueError(f"Invalid format: {fmt}")
+        if policy not in (POLICY_BLOCK, POLICY_DROP_NEWEST, POLICY_DROP_OLDEST):
+            raise ValueError(f"Invalid drop policy: {policy}")
+        self._stream = stream
+        self._fmt = fmt
+        self._policy = policy
+        self._labels = labels
+        self._sensor = sensor
+        self._values = [0] * len(labels)
+        if fmt == FORMAT_BINARY:
+            self._record_size = 8 + 2 * len(labels)
+        elif fmt == FORMAT_NDJSON:
+            self._keys = tuple(f',"{label}":'.encode() for label in labels)
+            self._record_size = 48 + sum(len(key) + _VALUE_WIDTH for key in self._keys)
+        else:
+            self._record_size = 48 + _VALUE_WIDTH * len(labels)
+        if buffer_size < self._record_size:
+            raise ValueError(f"Buffer must hold at least {self._record_size} bytes.")
+        self._record = bytearray(self._record_size)
+        self._queue = bytearray(buffer_size)
+        self._view = memoryview(self._queue)
+        self._head = 0  # Next byte to send
+        self._tail = 0  # End of queued data
+        self._first = 0  # Start of the record containing head (may be < 0)
+        self._sequence = 0
+        self._written = 0
+        self._dropped = 0
+        self._sent = 0
+        if fmt == FORMAT_CSV and header:
+            line = memoryview(("seq,t_ms," + ",".join(labels) + "\n").encode())
+            while line:
+                count = stream.write(line)
+                line = line[len(line) if count is None else count :]
+
+    @property
+    def record_format(self):
+        """
+        The ``struct`` format of a binary record, for decoding on the host.
+
+        :return: Format string such as ``"<2sHI13H"``
+        """
+        return f"<2sHI{len(self._labels)}H"
+
+    def _format(self, values, timestamp_ms):
+        """Format one record into the record buffer and return its length."""
+        buf = self._record
+        sequence = self._sequence
+        if self._fmt == FORMAT_BINARY:
+            buf[0:2] = BINARY_SYNC
+            buf[2] = sequence & 0xFF
+            buf[3] = (sequence >> 8) & 0xFF
+            for i in range(4):
+                buf[4 + i] = (timestamp_ms >> (8 * i)) & 0xFF
+            pos = 8
+            for value in values:
+                value = int(value + 0.5)
+                value = 0 if value < 0 else min(value, 0xFFFF)
+                buf[pos] = value & 0xFF
+                buf[pos + 1] = value >> 8
+                pos += 2
+            return pos
+        if self._fmt == FORMAT_NDJSON:
+            pos = _put_bytes(buf, 0, b'{"seq":')
+            pos = _put_int(buf, pos, sequence)
+            pos = _put_bytes(buf, pos, b',"t":')
+            pos = _put_int(buf, pos, timestamp_ms)
+            for key, value in zip(self._keys, values):
+                pos = _put_bytes(buf, pos, key)
+                pos = _put_value(buf, pos, value)
+            buf[pos] = 0x7D
+            pos += 1
+        else:
+            pos = _put_int(buf, 0, sequence)
+            buf[pos] = 0x2C
+            pos = _put_int(buf, pos + 1, timestamp_ms)
+            for value in values:
+                buf[pos] = 0x2C
+                pos = _put_value(buf, pos + 1, value)
+        buf[pos] = _NEWLINE
+        return pos + 1
+
+    def _record_end(self, start):
+        """Return the end of the queued record beginning at start."""
+        if self._fmt == FORMAT_BINARY:
+            return start + self._record_size
+        return self._queue.find(b"\n", max(start, 0), self._tail) + 1
+
+    def _drop_oldest(self):
+        """Remove the oldest record that has not started sending."""
+        end = self._record_end(self._first)
+        if self._first == self._head:
+            self._head = self._first = end
+            return True
+        if end >= self._tail:
+            return False  # Only the record being sent is queued
+        following = self._record_end(end)
+        remaining = self._tail - following
+        self._queue[end : end + remaining] = self._queue[following : self._tail]
+        self._tail = end + remaining
+        return True
+
+    def write(self, frame, timestamp_ms=None):
+        """
+        Queue one frame and send as much of the queue as the stream accepts.
+
+        :param frame: Dictionary of channel labels to values, or a sequence in
+            ``labels`` order
+        :param timestamp_ms: Timestamp in milliseconds (default: the sensor's
+            frame_timestamp, or ``time.monotonic_ns()`` without a sensor)
+        :return: True if the frame was queued, False if it was dropped
+        """
+        if timestamp_ms is None:
+            if self._sensor is None:
+                timestamp_ms = time.monotonic_ns() // 1000000
+            else:
+                timestamp_ms = self._sensor.frame_timestamp // 1000000
+        frame_values(frame, self._values, self._labels)
+        size = self._format(self._values, timestamp_ms & 0xFFFFFFFF)
+        self._sequence = (self._sequence + 1) & 0xFFFF
+        capacity = len(self._queue)
+        while self._tail - self._head + size > capacity:
+            if self._policy == POLICY_BLOCK:
+                self.pump()
+            elif self._policy == POLICY_DROP_OLDEST and self._drop_oldest():
+                self._dropped += 1
+            else:
+                self._dropped += 1
+                self.pump()
+                return False
+        if self._tail + size > capacity:
+            pending = self._tail - self._head
+            self._queue[0:pending] = self._queue[self._head : self._tail]
+            self._first -= self._head
+            self._head = 0
+            self._tail = pending
+        self._queue[self._tail : self._tail + size] = self._record[0:size]
+        self._tail += size
+        self._written += 1
+        self.pump()
+        return True
+
+    def pump(self):
+        """
+        Send queued data without waiting for a slow stream.
+
+        :return: Number of bytes the stream accepted
+        """
+        if self._head == self._tail:
+            return 0
+        count = self._stream.write(self._view[self._head : self._tail])
+        if count is None:
+            count = self._tail - self._head
+        self._head += count
+        self._sent += count
+        if self._head == self._tail:
+            self._head = self._tail = self._first = 0
+        else:
+            while True:
+                end = self._record_end(self._first)
+                if end > self._head:
+                    break
+                self._first = end
+        return count
+
+    def flush(self):
+        """Send all queued data, waiting for the stream as needed."""
+        while self._head != self._tail:
+            self.pump()
+
+    @property
+    def pending(self):
+        """
+        The number of queued bytes not yet accepted by the stream.
+
+        :return: Byte count
+        """
+        return self._tail - self._head
+
+    @property
+    def frames_written(self):
+        """
+        The number of frames queued for output.
+
+        :return: Frame count
+        """
+        return self._written
+
+    @property
+    def frames_dropped(self):
+        """
+        The number of frames discarded by the drop policy.
+
+        :return: Frame count
+        """
+        return self._dropped
+
+    @property
+    def bytes_sent(self):
+        """
+        The number of bytes accepted by the stream.
+
+        :return: Byte count
+        """
+        return self._sent
@@ -0,0 +1,163 @@
+# SPDX-FileCopyrightText: 2025 Joe Pardue
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`as7343.flicker`
+================================================================================
+
+Frequency analysis for raw flicker samples captured with
+:meth:`~as7343.AS7343.read_flicker_samples`.
+
+When ulab (or numpy on CPython) is available the dominant frequency comes from a
+single FFT, zero-padded to a power of two so that partial captures of any
+length can be analyzed. Otherwise a Goertzel filter is evaluated at each candidate
+frequency, which needs no extra buffers and is cheap when only a band of
+frequencies is of interest (e.g. 90-130 Hz around the mains harmonics).
+
+* Author(s): Joe Pardue
+"""
+
+import math
+
+try:
+    from ulab import numpy as np
+except ImportError:
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+
+
+def goertzel_power(samples, sample_rate, frequency, count=None, mean=None):
+    """
+    Return the signal power at one frequency using the Goertzel algorithm.
+
+    The mean is removed first so that the DC level does not leak into low
+    frequency bins.
+
+    :param samples: Sequence of raw flicker samples
+    :param sample_rate: Sample rate in Hz
+    :param frequency: Frequency to evaluate in Hz
+    :param count: Number of samples to use (default: all)
+    :param mean: Mean of the samples, when evaluating several frequencies
+        (default: computed from the samples)
+    :return: Power at ``frequency`` (arbitrary units)
+    """
+    if count is None:
+        count = len(samples)
+    if mean is None:
+        mean = sum(samples[i] for i in range(count)) / count
+    coeff = 2.0 * math.cos(2.0 * math.pi * frequency / sample_rate)
+    s_prev = 0.0
+    s_prev2 = 0.0
+    for i in range(count):
+        s = samples[i] - mean + coeff * s_prev - s_prev2
+        s_prev2 = s_prev
+        s_prev = s
+    return s_prev2 * s_prev2 + s_prev * s_prev - coeff * s_prev * s_prev2
+
+
+def modulation_depth(samples, count=None):
+    """
+    Return the modulation depth (percent flicker) of a waveform.
+
+    :param samples: Sequence of raw flicker samples
+    :param count: Number of samples to use (default: all)
+    :return: ``(max - min) / (max + min)`` in the range 0.0-1.0
+    """
+    if count is None:
+        count = len(samples)
+    low = high = samples[0]
+    for i in range(1, count):
+        val = samples[i]
+        if val < low:
+            low = val
+        elif val > high:
+            high = val
+    if high + low == 0:
+        return 0.0
+    return (high - low) / (high + low)
+
+
+def _fft_peak(samples, sample_rate, count, min_freq, max_freq):
+    """Return the strongest frequency between min_freq and max_freq via FFT."""
+    # ulab only transforms power-of-two lengths, so zero-pad up to one
+    size = 1
+    while size < count:
+        size <<= 1
+    mean = sum(samples[i] for i in range(count)) / count
+    data = np.zeros(size)
+    for i in range(count):
+        data[i] = samples[i] - mean
+    result = np.fft.fft(data)
+    if isinstance(result, tuple):  # ulab returns (real, imag)
+        real, imag = result
+        power = real * real + imag * imag
+    else:
+        power = abs(result) ** 2
+    resolution = sample_rate / size
+    first = max(1, int(math.ceil(min_freq / resolution)))
+    last = min(size // 2, int(max_freq / resolution))
+    best = first
+    for k in range(first, last + 1):
+        if power[k] > power[best]:
+            best = k
+    return best * resolution
+
+
+def dominant_frequency(
+    samples, sample_rate, min_freq=20.0, max_freq=None, step=None, count=None
+):
+    """
+    Estimate the dominant flicker frequency.
+
+    :param samples: Sequence of raw flicker samples
+    :param sample_rate: Sample rate in Hz
+    :param min_freq: Lowest frequency of interest in Hz (default: 20)
+    :param max_freq: Highest frequency of interest in Hz (default: Nyquist)
+    :param step: Goertzel scan step in Hz (default: the FFT bin width); ignored
+        when ulab/numpy is available
+    :param count: Number of samples to use (default: all)
+    :return: Dominant frequency in Hz
+    :raises ValueError: If fewer than 4 samples are provided
+    """
+    if count is None:
+        count = len(samples)
+    if count < 4:
+        raise ValueError("At least 4 samples are required.")
+    nyquist = sample_rate / 2
+    if max_freq is None or max_freq > nyquist:
+        max_freq = nyquist
+    if np is not None:
+        return _fft_peak(samples, sample_rate, count, min_freq, max_freq)
+    if step is None:
+        step = sample_rate / count
+    mean = sum(samples[i] for i in range(count)) / count
+    best_freq = min_freq
+    best_power = -1.0
+    freq = min_freq
+    while freq <= max_freq:
+        power = goertzel_power(samples, sample_rate, freq, count, mean)
+        if power > best_power:
+            best_power = power
+            best_freq = freq
+        freq += step
+    return best_freq
+
+
+def analyze(samples, sample_rate, min_freq=20.0, max_freq=None, count=None):
+    """
+    Estimate the dominant frequency and modulation depth in one call.
+
+    :param samples: Sequence of raw flicker samples
+    :param sample_rate: Sample rate in Hz
+    :param min_freq: Lowest frequency of interest in Hz (default: 20)
+    :param max_freq: Highest frequency of interest in Hz (default: Nyquist)
+    :param count: Number of samples to use (default: all)
+    :return: Tuple of (frequency in Hz, modulation depth 0.0-1.0)
+    """
+    return (
+        dominant_frequency(samples, sample_rate, min_freq, max_freq, count=count),
+        modulation_depth(samples, count),
+    )
@@ -0,0 +1,177 @@
+# SPDX-FileCopyrightText: 2025 Joe Pardue
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`as7343.hdr`
+================================================================================
+
+High dynamic range reads by fusing exposures at several gains or integration
+times.
+
+For each SMUX mode the SMUX registers are written once and every exposure is
+taken back to back, changing only the gain (one register) or ATIME/ASTEP. The
+exposure order alternates direction between modes, so the last exposure of one
+mode is the first of the next and needs no reconfiguration.
+
+Each channel takes its value from the most sensitive exposure that is not
+saturated, scaled by the exact gain and integration time ratios (using the
+times programmed in ATIME/ASTEP) to a common reference, giving a single
+extended-range frame.
+
+* Author(s): Joe Pardue
+"""
+
+from . import GAIN_1X, GAIN_16X, GAIN_256X, SMUX_VISIBLE, SMUX_NIR, SMUX_FZF5
+
+
+def gain_factor(gain):
+    """
+    Return the nominal amplification of a gain setting.
+
+    :param gain: One of the GAIN_* constants
+    :return: Gain multiplier (0.5 for GAIN_0_5X, 2 ** (gain - 1) otherwise)
+    """
+    return 0.5 if gain == 0 else 1 << (gain - 1)
+
+
+class HDRReader:
+    """
+    Read extended-range frames from several exposures.
+
+    :param sensor: The :class:`~as7343.AS7343` to read from
+    :param exposures: Sequence of exposures, each a GAIN_* constant or a
+        ``(gain, integration_time_us)`` tuple (default: 1x, 16x and 256x gain
+        at the current integration time)
+    :param modes: SMUX modes to read (default: all three built-in modes)
+    :param reference_gain: Gain the output is scaled to (default: GAIN_1X)
+    :param float saturation: Fraction of full scale treated as saturated
+        (default: 0.95)
+    :param bool restore: Restore the original gain and integration time after
+        each read (default: True)
+    :raises ValueError: If no exposures are given
+    """
+
+    def __init__(
+        self,
+        sensor,
+        exposures=(GAIN_1X, GAIN_16X, GAIN_256X),
+        modes=(SMUX_VISIBLE, SMUX_NIR, SMUX_FZF5),
+        reference_gain=GAIN_1X,
+        saturation=0.95,
+        restore=True,
+    ):
+        if not exposures:
+            raise ValueError("At least one exposure is required.")
+        self._sensor = sensor
+        self._exposures = tuple(
+            tuple(exposure) if isinstance(exposure, tuple) else (exposure, None)
+            for exposure in exposures
+        )
+        self._modes = tuple(modes)
+        self._reference_gain = reference_gain
+        self._saturation = saturation
+        self._restore = restore
+        self._sources = {}
+        self._saturated = set()
+
+    @property
+    def exposures(self):
+        """
+        The configured exposures.
+
+        :return: Tuple of (gain, integration_time_us or None) tuples
+        """
+        return self._exposures
+
+    @property
+    def sources(self):
+        """
+        The exposure each channel of the last frame came from.
+
+        :return: Dictionary mapping channel labels to indices into exposures
+        """
+        return self._sources
+
+    @property
+    def saturated(self):
+        """
+        Channels of the last frame that were saturated in every exposure.
+
+        :return: Set of channel labels
+        """
+        return self._saturated
+
+    def _setting(self, index, integration_time):
+        """Return (gain, integration time) of an exposure, filling in the default."""
+        gain, exposure_time = self._exposures[index]
+        return gain, exposure_time or integration_time
+
+    def _schedule(self, integration_time):
+        """Order exposures so that consecutive ones share the integration time."""
+        return sorted(
+            range(len(self._exposures)),
+            key=lambda i: self._setting(i, integration_time)[::-1],
+        )
+
+    def read(self):
+        """
+        Take all exposures and fuse them into one frame.
+
+        :return: Dictionary of channel labels mapping to values in counts at
+            the reference gain and the original integration time
+        """
+        sensor = self._sensor
+        original_gain = sensor.gain
+        original_time = sensor.integration_time
+        order = self._schedule(original_time)
+        current = (original_gain, original_time)
+        if (
+            self._setting(order[-1], original_time) == current
+            and self._setting(order[0], original_time) != current
+        ):
+            order.reverse()  # Start with the exposure already configured
+        # Scale by the programmed times, which can differ from the requested
+        reference = gain_factor(self._reference_gain) * (
+            sensor.achieved_integration_time
+        )
+        best = {}  # label: (scale, value, index) of most sensitive unsaturated
+        fallback = {}  # label: (scale, value, index) of least sensitive
+        try:
+            for step, mode in enumerate(self._modes):
+                sensor.set_smux_mode(mode)
+                label_map = sensor.get_smux_map(mode)
+                for index in order if step % 2 == 0 else reversed(order):
+                    gain, integration_time = self._setting(index, original_time)
+                    if sensor.gain != gain:
+                        sensor.gain = gain
+                    if sensor.integration_time != integration_time:
+                        sensor.integration_time = integration_time
+                    limit = self._saturation * sensor.max_count
+                    scale = gain_factor(gain) * sensor.achieved_integration_time
+                    for label, value in sensor.measure(label_map).items():
+                        if value < limit:
+                            prior = best.get(label)
+                            if prior is None or scale > prior[0]:
+                                best[label] = (scale, value, index)
+                        prior = fallback.get(label)
+                        if prior is None or scale < prior[0]:
+                            fallback[label] = (scale, value, index)
+        finally:
+            if self._restore:
+                if sensor.gain != original_gain:
+                    sensor.gain = original_gain
+                if sensor.integration_time != original_time:
+                    sensor.integration_time = original_time
+        frame = {}
+        self._sources = {}
+        self._saturated = set()
+        for label, entry in fallback.items():
+            if label in best:
+                entry = best[label]
+            else:
+                self._saturated.add(label)
+            scale, value, index = entry
+            frame[label] = value * reference / scale
+            self._sources[label] = index
+        return frame
@@ -0,0 +1,198 @@
+# SPDX-FileCopyrightText: 2025 Joe Pardue
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`as7343.matching`
+================================================================================
+
+Match spectra against a reference library, for example to sort materials or
+LEDs.
+
+:class:`SpectralMatcher` normalizes every reference spectrum to unit length
+once, when the library is loaded, and stacks them into a matrix. A frame is
+then compared with the whole library in a single matrix-vector product: with
+unit references, ranking by dot product is ranking by cosine similarity, so the
+frame itself never needs normalizing to find the nearest references. Scores are
+reported as cosine similarity (1 for the same spectral shape) or as the
+spectral angle in radians (0 for the same shape), which rank identically.
+
+With numpy or ulab the product (and a whole batch of frames, in
+:meth:`SpectralMatcher.match_batch`) is vectorized. Without them, or with
+``fixed_point=True`` on boards without an FPU, the references are stored as
+fixed-point integers, each frame is scaled into the same range, and the
+ranking uses integer arithmetic only; floating point is used just to scale the
+frame and report the k returned scores.
+
+* Author(s): Joe Pardue
+"""
+
+import math
+from array import array
+
+from . import CHANNEL_LABELS
+from ._frame import frame_values
+
+try:
+    from ulab import numpy as np
+except ImportError:
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+
+METRIC_COSINE = "COSINE"  #: Score by cosine similarity (higher is closer)
+METRIC_ANGLE = "ANGLE"  #: Score by spectral angle in radians (lower is closer)
+
+
+class SpectralMatcher:
+    """
+    Find the nearest reference spectra of a frame.
+
+    :param references: Dictionary mapping reference names to spectra, or a
+        sequence of ``(name, spectrum)`` pairs; each spectrum is a frame
+        dictionary or a sequence in ``labels`` order
+    :param metric: METRIC_COSINE (default) or METRIC_ANGLE
+    :param bool fixed_point: Rank with integer arithmetic instead of numpy/ulab
+        or floats (default: False, and always used without numpy/ulab)
+    :param int frac_bits: Fractional bits of the fixed-point references
+        (default: 14)
+    :param labels: Channel labels, in frame order (default: CHANNEL_LABELS)
+    :raises ValueError: If the library is empty, a reference is all zero, or
+        the metric is unknown
+    """
+
+    def __init__(
+        self,
+        references,
+        metric=METRIC_COSINE,
+        fixed_point=False,
+        frac_bits=14,
+        labels=CHANNEL_LABELS,
+    ):
+        if metric not in (METRIC_COSINE, METRIC_ANGLE):
+            raise ValueError(f"Invalid metric: {metric}")
+        pairs = references.items() if isinstance(references, dict) else references
+        names = []
+        rows = []
+        for name, spectrum in pairs:
+            values = frame_values(spectrum, None, labels)
+            norm = math.sqrt(sum(v * v for v in values))
+            if not norm:
+                raise ValueError(f"Reference {name} is all zero.")
+            names.append(name)
+            rows.append([v / norm for v in values])
+        if not names:
+            raise ValueError("The reference library is empty.")
+        self._names = tuple(names)
+        self._metric = metric
+        self._labels = labels
+        self._size = len(labels)
+        self._values = [0] * self._size
+        self._fixed = fixed_point or np is None
+        if self._fixed:
+            self._scale = 1 << frac_bits
+            self._matrix = [
+                array("l", [round(v * self._scale) for v in row]) for row in rows
+            ]
+        else:
+            self._matrix = np.array(rows)
+
+    @property
+    def names(self):
+        """
+        The reference names, in library order.
+
+        :return: Tuple of names
+        """
+        return self._names
+
+    def _score(self, cosine):
+        """Convert a cosine similarity to the configured metric."""
+        if self._metric == METRIC_ANGLE:
+            return math.acos(cosine)
+        return cosine
+
+    def _top(self, similarities, norm, k):
+        """Return the k best (name, score) pairs of fixed-point similarities."""
+        best = []
+        for index, similarity in enumerate(similarities):
+            if len(best) == k and similarity <= best[-1][0]:
+                continue
+            position = len(best)
+            while position and similarity > best[position - 1][0]:
+                position -= 1
+            best.insert(position, (similarity, index))
+            if len(best) > k:
+                best.pop()
+        scale = norm * self._scale
+        return [self._result(index, similarity, scale) for similarity, index in best]
+
+    def _ranked(self, similarities, order, norm, k):
+        """Return the k best (name, score) pairs from an ascending argsort."""
+        matches = []
+        for rank in range(1, min(k, len(self._names)) + 1):
+            index = int(order[-rank])
+            matches.append(self._result(index, float(similarities[index]), norm))
+        return matches
+
+    def _result(self, index, similarity, scale):
+        """Return the (name, score) pair of one reference."""
+        cosine = max(-1.0, min(1.0, similarity / scale)) if scale else 0.0
+        return (self._names[index], self._score(cosine))
+
+    def match(self, frame, k=1):
+        """
+        Find the k references closest in spectral shape to one frame.
+
+        :param frame: Dictionary from read_all() or a sequence in ``labels``
+            order
+        :param int k: Number of matches to return (default: 1)
+        :return: List of (name, score) pairs, closest first
+        """
+        values = frame_values(frame, self._values, self._labels)
+        if not self._fixed:
+            norm = math.sqrt(sum(v * v for v in values))
+            similarities = np.dot(self._matrix, np.array(values))
+            return self._ranked(similarities, np.argsort(similarities), norm, k)
+        # Scale the frame to the fixed-point range of the references, so
+        # fractional values (dark-subtracted or calibrated frames) keep
+        # their resolution
+        peak = max(abs(v) for v in values)
+        factor = self._scale / peak if peak else 0
+        for i in range(self._size):
+            values[i] = round(values[i] * factor)
+        norm = math.sqrt(sum(v * v for v in values))
+        similarities = []
+        for row in self._matrix:
+            dot = 0
+            for i in range(self._size):
+                dot += values[i] * row[i]
+            similarities.append(dot)
+        return self._top(similarities, norm, k)
+
+    def match_batch(self, frames, k=1):
+        """
+        Find the k closest references of several frames.
+
+        With numpy/ulab the whole batch is one ``(B x channels) . (channels x
+        references)`` matrix multiply.
+
+        :param frames: Iterable of frames (dictionaries or sequences), or a
+            B x channels array
+        :param int k: Number of matches per frame (default: 1)
+        :return: List with one list of (name, score) pairs per frame
+        """
+        if self._fixed:
+            return [self.match(frame, k) for frame in frames]
+        if not hasattr(frames, "shape"):
+            frames = np.array(
+                [frame_values(frame, None, self._labels) for frame in frames]
+            )
+        similarities = np.dot(frames, self._matrix.transpose())
+        norms = np.sqrt(np.sum(frames * frames, axis=1))
+        order = np.argsort(similarities, axis=1)
+        return [
+            self._ranked(similarities[row], order[row], float(norms[row]), k)
+            for row in range(len(norms))
+        ]
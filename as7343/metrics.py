@@ -0,0 +1,316 @@
+# SPDX-FileCopyrightText: 2025 Joe Pardue
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`as7343.metrics`
+================================================================================
+
+Operational metrics in the Prometheus text exposition format.
+
+Every :class:`~as7343.AS7343` keeps plain integer counters of frames, I2C
+errors, retries, saturated frames and recoveries, and a read_all() latency
+histogram (see :attr:`~as7343.AS7343.metrics`). :class:`MetricsRegistry`
+renders them, plus any counters, gauges and :class:`Histogram` objects from the
+acquisition loops, as Prometheus text. Updates on the hot path are single
+integer operations and rendering only reads them, so no locks are taken.
+
+On CPython, :meth:`MetricsRegistry.serve` starts a small HTTP server answering
+``GET /metrics`` in a background thread.
+
+* Author(s): Joe Pardue
+"""
+
+from .hdr import gain_factor
+
+_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _number(value):
+    """Format a sample value."""
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def _labels(pairs):
+    """Format a label set such as ``{sensor="0"}``."""
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram in preallocated storage.
+
+    :param buckets: Increasing bucket upper bounds
+    :raises ValueError: If no buckets are given or they are not increasing
+    """
+
+    def __init__(self, buckets):
+        bounds = tuple(buckets)
+        if not bounds or any(b <= a for a, b in zip(bounds, bounds[1:])):
+            raise ValueError("Buckets must be a non-empty increasing sequence.")
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)
+        self._sum = 0
+
+    def observe(self, value):
+        """
+        Record one observation.
+
+        :param value: Observed value
+        """
+        bucket = 0
+        for bound in self._bounds:
+            if value <= bound:
+                break
+            bucket += 1
+        self._counts[bucket] += 1
+        self._sum += value
+
+    @property
+    def buckets(self):
+        """
+        The bucket upper bounds.
+
+        :return: Tuple of bounds (the implicit last bucket is unbounded)
+        """
+        return self._bounds
+
+    @property
+    def counts(self):
+        """
+        Observations per bucket.
+
+        :return: List of counts, one more than there are bounds
+        """
+        return self._counts
+
+    @property
+    def sum(self):
+        """
+        The sum of all observations.
+
+        :return: Sum
+        """
+        return self._sum
+
+
+class MetricsRegistry:
+    """
+    Collect driver and application metrics and render them for Prometheus.
+
+    :param sensors: Sequence of :class:`~as7343.AS7343` instances to report,
+        labelled by their index (default: none)
+    :param str namespace: Metric name prefix (default: ``"as7343"``)
+    """
+
+    def __init__(self, sensors=(), namespace="as7343"):
+        self._namespace = namespace
+        self._sensors = []
+        self._metrics = []  # (name, type, help, source, labels)
+        for sensor in sensors:
+            self.add_sensor(sensor)
+
+    def add_sensor(self, sensor, name=None):
+        """
+        Report the built-in counters of a sensor.
+
+        :param sensor: The :class:`~as7343.AS7343`
+        :param name: Value of the ``sensor`` label (default: its index)
+        """
+        if name is None:
+            name = str(len(self._sensors))
+        self._sensors.append((name, sensor))
+
+    def _add(self, name, kind, help_text, source, labels):
+        """Register one metric."""
+        self._metrics.append(
+            (f"{self._namespace}_{name}", kind, help_text, source, tuple(labels))
+        )
+
+    def counter(self, name, help_text, source, labels=()):
+        """
+        Add a counter read from a callable, for example an acquisition loop's
+        frame or drop count.
+
+        :param str name: Metric name without the namespace, ending in _total
+        :param str help_text: Description
+        :param source: Callable returning the current value
+        :param labels: Optional sequence of (label, value) pairs
+        """
+        self._add(name, "counter", help_text, source, labels)
+
+    def gauge(self, name, help_text, source, labels=()):
+        """
+        Add a gauge read from a callable.
+
+        :param str name: Metric name without the namespace
+        :param str help_text: Description
+        :param source: Callable returning the current value
+        :param labels: Optional sequence of (label, value) pairs
+        """
+        self._add(name, "gauge", help_text, source, labels)
+
+    def histogram(self, name, help_text, histogram, labels=()):
+        """
+        Add a :class:`Histogram`.
+
+        :param str name: Metric name without the namespace
+        :param str help_text: Description
+        :param histogram: The histogram to report
+        :param labels: Optional sequence of (label, value) pairs
+        """
+        self._add(name, "histogram", help_text, histogram, labels)
+
+    def _sensor_lines(self, lines):
+        """Append the built-in sensor metrics."""
+        prefix = self._namespace
+        snapshots = [
+            (name, sensor, sensor.metrics) for name, sensor in self._sensors
+        ]
+        for metric, kind, help_text, value in (
+            ("frames_total", "counter", "Frames read", "frames"),
+            ("i2c_errors_total", "counter", "Failed I2C transfers", "i2c_errors"),
+            ("retries_total", "counter", "Retried I2C transfers", "retries"),
+            (
+                "saturation_events_total",
+                "counter",
+                "Frames with a channel at ADC full scale",
+                "saturations",
+            ),
+            ("recoveries_total", "counter", "Automatic recoveries", "recoveries"),
+            (
+                "recovery_seconds_total",
+                "counter",
+                "Time spent recovering",
+                "recovery_time",
+            ),
+            (
+                "last_recovery_seconds",
+                "gauge",
+                "Duration of the last recovery",
+                "last_recovery_time",
+            ),
+        ):
+            lines.append(f"# HELP {prefix}_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_{metric} {kind}")
+            for name, _, snapshot in snapshots:
+                lines.append(
+                    f'{prefix}_{metric}{{sensor="{name}"}} {_number(snapshot[value])}'
+                )
+        for metric, help_text, read in (
+            (
+                "integration_time_seconds",
+                "Programmed integration time",
+                lambda sensor: sensor.achieved_integration_time / 1e6,
+            ),
+            ("gain", "ADC gain factor", lambda sensor: gain_factor(sensor.gain)),
+        ):
+            lines.append(f"# HELP {prefix}_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_{metric} gauge")
+            for name, sensor, _ in snapshots:
+                lines.append(
+                    f'{prefix}_{metric}{{sensor="{name}"}} {_number(read(sensor))}'
+                )
+        metric = f"{prefix}_frame_latency_seconds"
+        lines.append(f"# HELP {metric} Time taken by read_all()")
+        lines.append(f"# TYPE {metric} histogram")
+        for name, _, snapshot in snapshots:
+            self._histogram_lines(
+                lines,
+                metric,
+                (("sensor", name),),
+                snapshot["latency_buckets"],
+                snapshot["latency_counts"],
+                snapshot["latency_sum"],
+            )
+
+    @staticmethod
+    def _histogram_lines(lines, metric, labels, bounds, counts, total):
+        """Append the cumulative bucket, sum and count lines of a histogram."""
+        cumulative = 0
+        for bound, count in zip(bounds, counts):
+            cumulative += count
+            le = labels + (("le", _number(bound)),)
+            lines.append(f"{metric}_bucket{_labels(le)} {cumulative}")
+        cumulative += counts[len(bounds)]
+        le = labels + (("le", "+Inf"),)
+        lines.append(f"{metric}_bucket{_labels(le)} {cumulative}")
+        lines.append(f"{metric}_sum{_labels(labels)} {_number(total)}")
+        lines.append(f"{metric}_count{_labels(labels)} {cumulative}")
+
+    def render(self):
+        """
+        Render all metrics in the Prometheus text format.
+
+        :return: Exposition text
+        """
+        lines = []
+        if self._sensors:
+            self._sensor_lines(lines)
+        described = set()
+        for name, kind, help_text, source, labels in self._metrics:
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+            if kind == "histogram":
+                counts = list(source.counts)
+                self._histogram_lines(
+                    lines, name, labels, source.buckets, counts, source.sum
+                )
+            else:
+                lines.append(f"{name}{_labels(labels)} {_number(source())}")
+        return "\n".join(lines) + "\n"
+
+    def handler_class(self):
+        """
+        Return an ``http.server`` request handler serving ``/metrics``.
+
+        :return: BaseHTTPRequestHandler subclass bound to this registry
+        """
+        from http.server import BaseHTTPRequestHandler  # CPython only
+
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            """Answer GET /metrics with the rendered registry."""
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                """Serve the metrics page."""
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", _CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                """Keep scrapes out of the log."""
+
+        return MetricsHandler
+
+    def serve(self, host="", port=9100):
+        """
+        Serve ``/metrics`` over HTTP from a background thread (CPython only).
+
+        :param str host: Address to bind (default: all interfaces)
+        :param int port: TCP port (default: 9100)
+        :return: The running ``http.server.ThreadingHTTPServer``; call its
+            ``shutdown()`` to stop it
+        """
+        import threading  # CPython only
+        from http.server import ThreadingHTTPServer
+
+        server = ThreadingHTTPServer((host, port), self.handler_class())
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        return server
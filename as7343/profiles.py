@@ -0,0 +1,173 @@
+# SPDX-FileCopyrightText: 2025 Joe Pardue
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`as7343.profiles`
+================================================================================
+
+Named measurement profiles compiled once and switched with minimal bus traffic.
+
+A :class:`Profile` holds a complete set-up (gain, integration time, wait time,
+SMUX selection and low-power bit) and compiles it on creation into the register
+values the driver tracks, in the form of :attr:`~as7343.AS7343.config_snapshot`:
+ATIME/ASTEP are solved, the wait time is converted to WTIME and SMUX modes are
+resolved to their 20-byte images. Applying a profile compares it with the
+configuration in effect and sends only the registers that differ, as one
+batched burst (see :meth:`~as7343.AS7343.apply_config`), so switching between
+profiles that share most settings costs a few bytes on the bus.
+
+:class:`ProfileSet` keeps a sensor's named profiles and the one in effect.
+
+* Author(s): Joe Pardue
+"""
+
+from . import (
+    GAIN_4X,
+    _LOW_POWER_BIT,
+    _SMUX_MODES,
+    _WTIME_STEP_US,
+    _solve_timing,
+)
+
+_SMUX_SIZE = 20
+
+
+class Profile:
+    """
+    A named, precompiled sensor configuration.
+
+    :param str name: Profile name
+    :param gain: One of the GAIN_* constants (default: GAIN_4X)
+    :param integration_time: Integration time in microseconds
+        (default: 150000)
+    :param wait_time: Wait time between cycles in microseconds
+        (default: 2780, the minimum)
+    :param smux: SMUX configuration to load: one of the SMUX_* constants, a
+        20-byte SMUX image, or None to leave the SMUX registers alone
+        (default: None)
+    :param bool low_power: Set the CFG0 low-power bit (default: False)
+    :raises ValueError: If a setting is out of range or the SMUX mode is unknown
+    """
+
+    def __init__(
+        self,
+        name,
+        gain=GAIN_4X,
+        integration_time=150000,
+        wait_time=_WTIME_STEP_US,
+        smux=None,
+        low_power=False,
+    ):
+        if gain not in range(0x00, 0x0D):
+            raise ValueError("Invalid gain setting.")
+        atime, astep = _solve_timing(integration_time)
+        wtime = (wait_time + _WTIME_STEP_US // 2) // _WTIME_STEP_US - 1
+        if wtime not in range(0, 256):
+            raise ValueError("Invalid wait time.")
+        if isinstance(smux, str):
+            if smux not in _SMUX_MODES:
+                raise ValueError(f"Invalid SMUX mode: {smux}")
+            smux = _SMUX_MODES[smux]["smux"]
+        elif smux is not None:
+            smux = bytes(smux)
+            if len(smux) != _SMUX_SIZE:
+                raise ValueError(f"SMUX image must be {_SMUX_SIZE} bytes.")
+        self._name = name
+        self._snapshot = (
+            gain,
+            integration_time,
+            atime,
+            astep,
+            wtime,
+            _LOW_POWER_BIT if low_power else 0x00,
+            None,
+            smux,
+        )
+
+    @property
+    def name(self):
+        """
+        The profile name.
+
+        :return: Name
+        """
+        return self._name
+
+    @property
+    def snapshot(self):
+        """
+        The compiled register values, in the form of config_snapshot.
+
+        :return: Tuple to pass to apply_config() or restore_config()
+        """
+        return self._snapshot
+
+    def apply(self, sensor):
+        """
+        Switch a sensor to this profile, writing only the changed registers.
+
+        :param sensor: The :class:`~as7343.AS7343` to configure
+        :return: Number of registers written
+        """
+        return sensor.apply_config(self._snapshot)
+
+
+class ProfileSet:
+    """
+    The named profiles of one sensor.
+
+    :param sensor: The :class:`~as7343.AS7343` to configure
+    :param profiles: Initial sequence of :class:`Profile` objects
+    """
+
+    def __init__(self, sensor, profiles=()):
+        self._sensor = sensor
+        self._profiles = {}
+        self._current = None
+        for profile in profiles:
+            self.add(profile)
+
+    def add(self, profile):
+        """
+        Add a profile, replacing any profile with the same name.
+
+        :param profile: The :class:`Profile` to add
+        """
+        self._profiles[profile.name] = profile
+
+    def switch(self, name):
+        """
+        Apply a profile by name.
+
+        The profile is compared with the configuration the driver tracks, so
+        settings changed through the properties since the last switch are
+        also corrected.
+
+        :param str name: Profile name
+        :return: Number of registers written
+        :raises ValueError: If no profile has that name
+        """
+        if name not in self._profiles:
+            raise ValueError(f"Unknown profile: {name}")
+        written = self._profiles[name].apply(self._sensor)
+        self._current = name
+        return written
+
+    @property
+    def current(self):
+        """
+        The name of the profile last switched to.
+
+        :return: Profile name, or None before the first switch
+        """
+        return self._current
+
+    @property
+    def names(self):
+        """
+        The names of the available profiles.
+
+        :return: Tuple of names
+        """
+        return tuple(self._profiles)
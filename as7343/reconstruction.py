@@ -0,0 +1,278 @@
+# SPDX-FileCopyrightText: 2025 Joe Pardue
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`as7343.reconstruction`
+================================================================================
+
+Reconstruct a spectrum sampled on a uniform wavelength grid from the 13 discrete
+AS7343 channels.
+
+The channel response curves are modelled as Gaussians (peak wavelength and FWHM
+from the datasheet, or user supplied values) and stacked into a response matrix
+``R`` of shape 13 x N. The reconstruction matrix is the Tikhonov regularized
+pseudo-inverse ``M = R^T (R R^T + lambda I)^-1``, which only needs a 13 x 13
+inverse and is therefore cheap enough to build on a microcontroller. Once built
+for a grid it is cached, and every frame (or batch of frames) is mapped to the
+grid with a single matrix multiply.
+
+The output is a relative spectral shape in the same units as the input counts;
+absolute radiometry still requires a per-device calibration.
+
+* Author(s): Joe Pardue
+"""
+
+import math
+from array import array
+
+from . import CHANNEL_LABELS
+from ._frame import CHANNEL_COUNT, frame_values
+
+try:
+    from ulab import numpy as np
+except ImportError:
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+
+#: Approximate channel responses as (peak wavelength nm, FWHM nm), from the
+#: AS7343 datasheet. CLR is a broadband photodiode and is modelled as a very
+#: wide Gaussian.
+CHANNEL_RESPONSES = {
+    "F1": (405, 30),
+    "F2": (425, 22),
+    "FZ": (450, 55),
+    "F3": (475, 30),
+    "F4": (515, 40),
+    "F5": (550, 35),
+    "FY": (555, 100),
+    "FXL": (600, 80),
+    "F6": (640, 50),
+    "F7": (690, 55),
+    "F8": (745, 60),
+    "NIR": (855, 54),
+    "CLR": (650, 500),
+}
+
+_CACHE_SIZE = 4  # Number of reconstruction matrices kept in memory
+_cache = {}
+_cache_order = []
+
+
+def wavelength_grid(start=380, stop=1000, step=5):
+    """
+    Return the wavelengths of a uniform grid, including both end points.
+
+    :param start: First wavelength in nm
+    :param stop: Last wavelength in nm
+    :param step: Grid spacing in nm
+    :return: List of wavelengths in nm
+    :raises ValueError: If the grid is empty or the step is not positive
+    """
+    if step <= 0 or stop < start:
+        raise ValueError("Invalid wavelength grid.")
+    count = int((stop - start) / step + 1e-9) + 1
+    return [start + i * step for i in range(count)]
+
+
+def _response_matrix(grid, responses):
+    """Build the 13 x N channel response matrix as a list of rows."""
+    rows = []
+    for label in CHANNEL_LABELS:
+        peak, fwhm = responses[label]
+        sigma = fwhm / 2.3548200450309493  # FWHM = 2 * sqrt(2 * ln 2) * sigma
+        scale = -0.5 / (sigma * sigma)
+        rows.append([math.exp(scale * (w - peak) * (w - peak)) for w in grid])
+    return rows
+
+
+def _invert(matrix):
+    """Invert a small square matrix in place using Gauss-Jordan elimination."""
+    size = len(matrix)
+    inverse = [[1.0 if i == j else 0.0 for j in range(size)] for i in range(size)]
+    for col in range(size):
+        pivot = max(range(col, size), key=lambda r: abs(matrix[r][col]))
+        if abs(matrix[pivot][col]) < 1e-12:
+            raise ValueError("Response matrix is singular; increase regularization.")
+        matrix[col], matrix[pivot] = matrix[pivot], matrix[col]
+        inverse[col], inverse[pivot] = inverse[pivot], inverse[col]
+        factor = 1.0 / matrix[col][col]
+        row, inv_row = matrix[col], inverse[col]
+        for j in range(size):
+            row[j] *= factor
+            inv_row[j] *= factor
+        for r in range(size):
+            if r == col:
+                continue
+            f = matrix[r][col]
+            if f == 0.0:
+                continue
+            target, inv_target = matrix[r], inverse[r]
+            for j in range(size):
+                target[j] -= f * row[j]
+                inv_target[j] -= f * inv_row[j]
+    return inverse
+
+
+def _build_matrix(grid, regularization, responses):
+    """
+    Compute the transposed reconstruction matrix (13 x N).
+
+    The regularization is relative: lambda is scaled by the mean diagonal of
+    ``R R^T`` so the same value behaves consistently across grid spacings.
+    """
+    rows = _response_matrix(grid, responses)
+    gram = [
+        [sum(a * b for a, b in zip(rows[i], rows[j])) for j in range(CHANNEL_COUNT)]
+        for i in range(CHANNEL_COUNT)
+    ]
+    damping = regularization * sum(gram[i][i] for i in range(CHANNEL_COUNT))
+    damping /= CHANNEL_COUNT
+    for i in range(CHANNEL_COUNT):
+        gram[i][i] += damping
+    inverse = _invert(gram)
+    # (R^T G^-1)^T = G^-1 R, since G is symmetric
+    points = len(grid)
+    result = []
+    for i in range(CHANNEL_COUNT):
+        coeffs = inverse[i]
+        result.append(
+            array(
+                "f",
+                [
+                    sum(coeffs[k] * rows[k][n] for k in range(CHANNEL_COUNT))
+                    for n in range(points)
+                ],
+            )
+        )
+    if np is not None:
+        return np.array([list(row) for row in result])
+    return result
+
+
+def reconstruction_matrix(
+    start=380, stop=1000, step=5, regularization=0.01, responses=None
+):
+    """
+    Return the (cached) transposed reconstruction matrix for a grid.
+
+    The cache key includes the grid, the regularization and any custom
+    responses, so switching between grids does not rebuild matrices that are
+    still cached.
+
+    :param start: First wavelength in nm
+    :param stop: Last wavelength in nm
+    :param step: Grid spacing in nm
+    :param regularization: Relative Tikhonov regularization (> 0)
+    :param responses: Optional dictionary overriding :data:`CHANNEL_RESPONSES`
+    :return: 13 x N matrix (a numpy/ulab array when available, otherwise a list
+        of ``array('f')`` rows)
+    :raises ValueError: If the regularization is not positive
+    """
+    if regularization <= 0:
+        raise ValueError("Regularization must be positive.")
+    if responses is None:
+        responses_key = None
+        responses = CHANNEL_RESPONSES
+    else:
+        merged = dict(CHANNEL_RESPONSES)
+        merged.update(responses)
+        responses = merged
+        responses_key = tuple(responses[label] for label in CHANNEL_LABELS)
+    key = (start, stop, step, regularization, responses_key)
+    matrix = _cache.get(key)
+    if matrix is None:
+        matrix = _build_matrix(
+            wavelength_grid(start, stop, step), regularization, responses
+        )
+        if len(_cache_order) >= _CACHE_SIZE:
+            del _cache[_cache_order.pop(0)]
+        _cache[key] = matrix
+        _cache_order.append(key)
+    return matrix
+
+
+def clear_cache():
+    """Discard all cached reconstruction matrices."""
+    _cache.clear()
+    del _cache_order[:]
+
+
+class SpectralReconstructor:
+    """
+    Map AS7343 frames onto a uniform wavelength grid.
+
+    :param start: First wavelength in nm (default: 380)
+    :param stop: Last wavelength in nm (default: 1000)
+    :param step: Grid spacing in nm (default: 5)
+    :param regularization: Relative Tikhonov regularization (default: 0.01).
+        Larger values give smoother spectra at the cost of resolution.
+    :param responses: Optional dictionary of ``label: (peak_nm, fwhm_nm)``
+        overriding :data:`CHANNEL_RESPONSES`
+    """
+
+    def __init__(
+        self, start=380, stop=1000, step=5, regularization=0.01, responses=None
+    ):
+        self._wavelengths = wavelength_grid(start, stop, step)
+        self._matrix = reconstruction_matrix(
+            start, stop, step, regularization, responses
+        )
+        self._values = [0.0] * CHANNEL_COUNT
+
+    @property
+    def wavelengths(self):
+        """
+        The wavelengths of the output grid.
+
+        :return: List of wavelengths in nm
+        """
+        return self._wavelengths
+
+    def reconstruct(self, frame, out=None):
+        """
+        Reconstruct the spectrum for a single frame.
+
+        :param frame: Dictionary from read_all() or a list in
+            :data:`~as7343.CHANNEL_LABELS` order
+        :param out: Optional preallocated list or array of grid length
+            (ignored when numpy/ulab is used)
+        :return: Spectrum values, one per grid wavelength
+        """
+        values = frame_values(frame, self._values)
+        matrix = self._matrix
+        if np is not None:
+            return np.dot(np.array([values]), matrix)[0]
+        points = len(self._wavelengths)
+        if out is None:
+            out = array("f", bytes(4 * points))
+        for n in range(points):
+            out[n] = 0.0
+        for k in range(CHANNEL_COUNT):
+            value = values[k]
+            if not value:
+                continue
+            row = matrix[k]
+            for n in range(points):
+                out[n] += value * row[n]
+        return out
+
+    def reconstruct_batch(self, frames):
+        """
+        Reconstruct spectra for several frames at once.
+
+        With numpy/ulab the whole batch is a single ``(B x 13) . (13 x N)``
+        matrix multiply.
+
+        :param frames: Iterable of frames (dictionaries or ordered lists), or a
+            B x 13 array
+        :return: B x N array when numpy/ulab is available, otherwise a list of
+            spectra
+        """
+        if np is not None:
+            if not hasattr(frames, "shape"):
+                frames = np.array([frame_values(frame) for frame in frames])
+            return np.dot(frames, self._matrix)
+        return [self.reconstruct(frame) for frame in frames]
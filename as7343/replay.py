@@ -0,0 +1,290 @@
+# SPDX-FileCopyrightText: 2025 Joe Pardue
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`as7343.replay`
+================================================================================
+
+Replay recorded frames through the driver API.
+
+:class:`ReplaySensor` offers the measurement surface of
+:class:`~as7343.AS7343` (``read_all``, ``read_smux_mode``, ``data``,
+``channels``, ``frame_timestamp``, ``gain`` and ``integration_time``) but
+serves frames from a log
+written by :class:`~as7343.export.FrameExporter`, in any of its CSV, NDJSON or
+binary formats. Pipelines can then be debugged against field recordings and
+benchmarked without hardware.
+
+Playback follows the recorded timestamps in real time (``speed=1``),
+accelerated (``speed=10`` plays ten times faster) or as fast as possible
+(``speed=None``). Records are read one at a time, so logs of any length replay
+in constant memory.
+
+* Author(s): Joe Pardue
+"""
+
+import json
+import struct
+import time
+
+from . import CHANNEL_LABELS, GAIN_4X, _SMUX_MODES
+from .export import BINARY_SYNC
+
+
+def _parse(text):
+    """Parse a logged value as an int, or a float if it has a fraction."""
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+class ReplaySensor:
+    """
+    Serve recorded frames with the AS7343 measurement API.
+
+    :param source: Path of a log file, or a seekable binary stream
+    :param speed: Playback speed relative to the recording, or None to replay
+        as fast as possible (default: 1.0)
+    :param bool loop: Start over at the end of the log instead of raising
+        EOFError (default: False)
+    :param labels: Channel labels of binary logs, in record order
+        (default: CHANNEL_LABELS)
+    :param gain: Gain reported until a record provides one (default: GAIN_4X)
+    :param integration_time: Integration time in microseconds reported until a
+        record provides one (default: 150000)
+    :raises ValueError: If speed is not positive
+    """
+
+    def __init__(
+        self,
+        source,
+        speed=1.0,
+        loop=False,
+        labels=CHANNEL_LABELS,
+        gain=GAIN_4X,
+        integration_time=150000,
+    ):
+        if speed is not None and speed <= 0:
+            raise ValueError("Speed must be positive.")
+        self._owned = isinstance(source, str)
+        self._stream = open(source, "rb") if self._owned else source
+        self._speed = speed
+        self._loop = loop
+        self._labels = tuple(labels)
+        self._gain = gain
+        self._integration_time_us = integration_time
+        self._binary = struct.Struct(f"<2sHI{len(self._labels)}H")
+        self._start = self._stream.tell()
+        self._last_data = {}
+        self._frames = 0
+        self._frame_ns = 0
+        self._sniff()
+        self._restart_clock()
+
+    def _sniff(self):
+        """Detect the log format and read the CSV header."""
+        self._stream.seek(self._start)
+        head = self._stream.read(2)
+        self._stream.seek(self._start)
+        self._columns = None
+        if head == BINARY_SYNC:
+            self._format = "BINARY"
+        elif head[:1] == b"{":
+            self._format = "NDJSON"
+        else:
+            self._format = "CSV"
+            self._columns = self._stream.readline().decode().strip().split(",")
+
+    def _restart_clock(self):
+        """Align playback time with the next record."""
+        self._log_ms = None  # Unwrapped log time of the last record
+        self._last_stamp = None
+        self._wall_start = 0
+
+    def _read_record(self):
+        """Return (timestamp_ms, frame) of the next record, or None at the end."""
+        if self._format == "BINARY":
+            record = self._stream.read(self._binary.size)
+            if len(record) < self._binary.size:
+                return None
+            fields = self._binary.unpack(record)
+            if fields[0] != BINARY_SYNC:
+                raise ValueError("Lost sync in binary log.")
+            return fields[2], dict(zip(self._labels, fields[3:]))
+        line = self._stream.readline()
+        while line and not line.strip():
+            line = self._stream.readline()
+        if not line:
+            return None
+        if self._format == "NDJSON":
+            record = json.loads(line)
+            record.pop("seq", None)
+            stamp = record.pop("t", 0)
+            self._gain = record.pop("gain", self._gain)
+            self._integration_time_us = record.pop(
+                "integration_time", self._integration_time_us
+            )
+            return stamp, record
+        frame = {}
+        stamp = 0
+        for column, text in zip(self._columns, line.decode().strip().split(",")):
+            if column == "t_ms":
+                stamp = int(text)
+            elif column != "seq":
+                frame[column] = _parse(text)
+        return stamp, frame
+
+    def _next_frame(self):
+        """Read the next frame and wait until it is due."""
+        record = self._read_record()
+        if record is None:
+            if not self._loop:
+                raise EOFError("End of recording.")
+            self.rewind()
+            record = self._read_record()
+            if record is None:
+                raise EOFError("Recording is empty.")
+        stamp, frame = record
+        if self._log_ms is None:
+            self._log_ms = 0
+            self._wall_start = time.monotonic_ns()
+        else:
+            self._log_ms += (stamp - self._last_stamp) & 0xFFFFFFFF
+        self._last_stamp = stamp
+        now = time.monotonic_ns()
+        if self._speed is not None:
+            due = self._wall_start + int(self._log_ms * 1e6 / self._speed)
+            if due > now:
+                time.sleep((due - now) / 1e9)
+                now = due
+        self._frame_ns = now
+        self._frames += 1
+        self._last_data = frame
+        return frame
+
+    def read_all(self):
+        """
+        Return the next recorded frame.
+
+        :return: Dictionary of channel labels mapping to values
+        :raises EOFError: At the end of the log when not looping
+        """
+        return self._next_frame()
+
+    def read_smux_mode(self, mode_name):
+        """
+        Return the channels of one SMUX mode from the next recorded frame.
+
+        :param mode_name: One of the SMUX_* constants
+        :return: Dictionary of channel labels mapping to values
+        :raises ValueError: If an invalid mode name is provided
+        :raises EOFError: At the end of the log when not looping
+        """
+        label_map = self.get_smux_map(mode_name)
+        frame = self._next_frame()
+        return {label: frame.get(label, 0) for label, _ in label_map}
+
+    def get_smux_map(self, mode_name):
+        """
+        Get the channel mapping for a specific SMUX mode.
+
+        :param mode_name: One of the SMUX_* constants
+        :return: Tuple of (label, register_address) tuples
+        :raises ValueError: If an invalid mode name is provided
+        """
+        if mode_name not in _SMUX_MODES:
+            raise ValueError(f"Invalid SMUX mode: {mode_name}")
+        return _SMUX_MODES[mode_name]["map"]
+
+    def rewind(self):
+        """Restart playback from the beginning of the log."""
+        self._stream.seek(self._start)
+        self._sniff()
+        self._restart_clock()
+
+    def close(self):
+        """Close the log if it was opened from a path."""
+        if self._owned:
+            self._stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    @property
+    def data(self):
+        """
+        The most recently replayed frame.
+
+        :return: Dictionary mapping channel labels to values
+        """
+        return self._last_data
+
+    @property
+    def channels(self):
+        """
+        All spectral channel values of the last frame in a standard order.
+
+        :return: List of values in CHANNEL_LABELS order
+        """
+        return [self._last_data.get(label, 0) for label in CHANNEL_LABELS]
+
+    @property
+    def frame_timestamp(self):
+        """
+        The playback time of the last frame, when it was due on the replay
+        clock.
+
+        :return: Time in ``time.monotonic_ns()`` units (0 before the first
+            frame)
+        """
+        return self._frame_ns
+
+    @property
+    def frames(self):
+        """
+        The number of frames replayed.
+
+        :return: Frame count
+        """
+        return self._frames
+
+    @property
+    def gain(self):
+        """
+        The gain of the recording, or the value last assigned.
+
+        :return: Gain setting
+        """
+        return self._gain
+
+    @gain.setter
+    def gain(self, gain_value):
+        """
+        Set the reported gain. Recorded values are not rescaled.
+
+        :param gain_value: Gain setting
+        """
+        self._gain = gain_value
+
+    @property
+    def integration_time(self):
+        """
+        The integration time of the recording, or the value last assigned.
+
+        :return: Integration time in microseconds
+        """
+        return self._integration_time_us
+
+    @integration_time.setter
+    def integration_time(self, integration_time_us):
+        """
+        Set the reported integration time. Recorded values are not rescaled.
+
+        :param integration_time_us: Integration time in microseconds
+        """
+        self._integration_time_us = integration_time_us
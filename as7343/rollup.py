@@ -0,0 +1,203 @@
+# SPDX-FileCopyrightText: 2025 Joe Pardue
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`as7343.rollup`
+================================================================================
+
+Windowed min/mean/max rollups of the frame stream for dashboards.
+
+:class:`Rollup` keeps one or more aggregation tiers, for example per-minute and
+per-hour, each in fixed-size lists. Frames only update the shortest tier; when
+one of its windows closes the result is emitted and folded into the next tier,
+and so on up, so each frame costs O(channels) however many tiers there are and
+memory stays constant for any run length.
+
+Windows are aligned to multiples of their length on the timestamp clock, so
+with ``time.time_ns()`` timestamps the hourly windows start on the hour. A
+window closes when the first frame of a later window arrives, or on
+:meth:`Rollup.flush`. Windows without frames are not emitted.
+
+* Author(s): Joe Pardue
+"""
+
+import time
+
+from . import CHANNEL_LABELS
+from ._frame import frame_values
+
+
+class Window:
+    """
+    One completed aggregation window.
+
+    Instances are reused for the next window of the same tier; copy the values
+    if they must be kept.
+    """
+
+    def __init__(self, tier, length, size):
+        #: Index of the tier that produced the window (0 = shortest)
+        self.tier = tier
+        #: Window length in seconds
+        self.length = length
+        #: Start of the window on the timestamp clock, in nanoseconds
+        self.start_ns = 0
+        #: Number of frames aggregated
+        self.count = 0
+        #: Per-channel minimum, in label order
+        self.minimum = [0] * size
+        #: Per-channel mean, in label order
+        self.mean = [0.0] * size
+        #: Per-channel maximum, in label order
+        self.maximum = [0] * size
+
+
+class _Tier:
+    """Running aggregates of the open window of one tier."""
+
+    def __init__(self, length_ns, size):
+        self.length_ns = length_ns
+        self.index = 0  # Window number on the timestamp clock
+        self.count = 0
+        self.minimum = [0] * size
+        self.maximum = [0] * size
+        self.total = [0] * size
+
+
+class Rollup:
+    """
+    Aggregate frames into min/mean/max windows at several time scales.
+
+    :param windows: Increasing window lengths in seconds, each a multiple of
+        the previous one (default: one minute and one hour)
+    :param labels: Channel labels, in frame order (default: CHANNEL_LABELS)
+    :raises ValueError: If no windows are given, a length is not positive, or
+        a length is not a multiple of the previous one
+    """
+
+    def __init__(self, windows=(60, 3600), labels=CHANNEL_LABELS):
+        lengths = tuple(windows)
+        if not lengths or lengths[0] <= 0:
+            raise ValueError("Window lengths must be positive.")
+        for shorter, longer in zip(lengths, lengths[1:]):
+            if longer <= shorter or longer % shorter:
+                raise ValueError("Each window must be a multiple of the previous.")
+        self._labels = labels
+        self._size = size = len(labels)
+        self._tiers = [_Tier(int(length * 1e9), size) for length in lengths]
+        self._windows = [
+            Window(tier, length, size) for tier, length in enumerate(lengths)
+        ]
+        self._values = [0] * size
+        self._closed = []
+
+    def update(self, frame, timestamp_ns=None):
+        """
+        Add one frame, closing any windows it falls after.
+
+        The returned list is reused by the next call; copy it if it must be
+        kept.
+
+        :param frame: Dictionary from read_all() or a sequence in ``labels``
+            order
+        :param timestamp_ns: Frame time in nanoseconds, for example from
+            ``time.time_ns()`` (default: ``time.monotonic_ns()``)
+        :return: List of the :class:`Window` objects closed, shortest first
+        """
+        if timestamp_ns is None:
+            timestamp_ns = time.monotonic_ns()
+        closed = self._closed
+        del closed[:]
+        values = frame_values(frame, self._values, self._labels)
+        tier = self._tiers[0]
+        index = timestamp_ns // tier.length_ns
+        if tier.count and index != tier.index:
+            self._close(0, timestamp_ns)
+        minimum = tier.minimum
+        maximum = tier.maximum
+        total = tier.total
+        if not tier.count:
+            tier.index = index
+            for i in range(self._size):
+                val = values[i]
+                minimum[i] = maximum[i] = total[i] = val
+        else:
+            for i in range(self._size):
+                val = values[i]
+                if val < minimum[i]:
+                    minimum[i] = val
+                elif val > maximum[i]:
+                    maximum[i] = val
+                total[i] += val
+        tier.count += 1
+        return closed
+
+    def flush(self):
+        """
+        Close all open windows, for example before shutting down.
+
+        :return: List of the :class:`Window` objects closed, shortest first
+        """
+        closed = self._closed
+        del closed[:]
+        for level, tier in enumerate(self._tiers):
+            if tier.count:
+                self._close(level, None)
+        return closed
+
+    def _close(self, level, timestamp_ns):
+        """Emit the open window of a tier and fold it into the next tier."""
+        tier = self._tiers[level]
+        window = self._windows[level]
+        count = tier.count
+        window.start_ns = tier.index * tier.length_ns
+        window.count = count
+        for i in range(self._size):
+            window.minimum[i] = tier.minimum[i]
+            window.maximum[i] = tier.maximum[i]
+            window.mean[i] = tier.total[i] / count
+        self._closed.append(window)
+        tier.count = 0
+        if level + 1 == len(self._tiers):
+            return
+        upper = self._tiers[level + 1]
+        if not upper.count:
+            upper.index = window.start_ns // upper.length_ns
+            for i in range(self._size):
+                upper.minimum[i] = tier.minimum[i]
+                upper.maximum[i] = tier.maximum[i]
+                upper.total[i] = tier.total[i]
+        else:
+            for i in range(self._size):
+                if tier.minimum[i] < upper.minimum[i]:
+                    upper.minimum[i] = tier.minimum[i]
+                if tier.maximum[i] > upper.maximum[i]:
+                    upper.maximum[i] = tier.maximum[i]
+                upper.total[i] += tier.total[i]
+        upper.count += count
+        if (
+            timestamp_ns is not None
+            and timestamp_ns // upper.length_ns != upper.index
+        ):
+            self._close(level + 1, timestamp_ns)
+
+    @property
+    def windows(self):
+        """
+        The window lengths of the tiers.
+
+        :return: Tuple of lengths in seconds, shortest first
+        """
+        return tuple(window.length for window in self._windows)
+
+    def pending(self, tier=0):
+        """
+        Return the number of frames in the open window of a tier.
+
+        Frames reach a longer tier only when the shorter windows close.
+
+        :param int tier: Tier index (default: 0, the shortest)
+        :return: Frame count
+        """
+        return self._tiers[tier].count
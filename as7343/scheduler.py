@@ -0,0 +1,262 @@
+# SPDX-FileCopyrightText: 2025 Joe Pardue
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`as7343.scheduler`
+================================================================================
+
+Duty-cycled acquisition for battery powered nodes.
+
+:class:`DutyCycleScheduler` runs wake -> measure -> idle once per sampling
+period. The sensor is only powered for the exact integration time (see
+:attr:`~as7343.AS7343.cycle_time`) and the host sleeps in between, using
+CircuitPython's ``alarm`` module for light or deep sleep when it is available.
+
+Time spent in each power state is accumulated so the duty cycle and the
+sensor's charge/energy use can be estimated from real runs. The default supply
+currents are typical datasheet values; pass measured values for a better
+estimate.
+
+* Author(s): Joe Pardue
+"""
+
+import struct
+import time
+
+try:
+    import alarm
+except ImportError:
+    alarm = None
+
+IDLE_SHUTDOWN = "SHUTDOWN"  #: Power the sensor down (PON=0) between samples
+IDLE_LOW_POWER = "LOW_POWER"  #: Keep the sensor powered in low-power mode
+
+STATE_ACTIVE = 0  #: Sensor powered and integrating
+STATE_IDLE = 1  #: Sensor powered but not integrating
+STATE_SLEEP = 2  #: Sensor shut down
+
+#: Typical AS7343 supply current in mA for each state
+DEFAULT_CURRENTS = (0.300, 0.040, 0.001)
+
+_SLEEP_MEMORY_MAGIC = b"AS73"
+_SLEEP_MEMORY_FORMAT = "<4sQQQQ"  # Magic, active/idle/sleep ns, samples
+
+
+class DutyCycleScheduler:
+    """
+    Sample an AS7343 at a fixed period with minimal powered time.
+
+    :param sensor: The :class:`~as7343.AS7343` to sample
+    :param float period: Sampling period in seconds
+    :param reader: Callable returning one frame (default: ``sensor.read_all``);
+        for example ``SmuxPlanner(sensor).read`` bound to a channel set
+    :param idle: IDLE_SHUTDOWN (default) or IDLE_LOW_POWER
+    :param currents: Supply current in mA for (active, idle, sleep)
+    :param float voltage: Supply voltage for energy estimates (default: 1.8)
+    :param int sleep_memory_offset: Offset in ``alarm.sleep_memory`` used to
+        keep the accounting across deep sleep (default: 0)
+    :raises ValueError: If the period is not positive or idle is unknown
+    """
+
+    def __init__(
+        self,
+        sensor,
+        period,
+        reader=None,
+        idle=IDLE_SHUTDOWN,
+        currents=DEFAULT_CURRENTS,
+        voltage=1.8,
+        sleep_memory_offset=0,
+    ):
+        if period <= 0:
+            raise ValueError("Period must be positive.")
+        if idle not in (IDLE_SHUTDOWN, IDLE_LOW_POWER):
+            raise ValueError(f"Invalid idle mode: {idle}")
+        self._sensor = sensor
+        self._period_ns = int(period * 1e9)
+        self._reader = sensor.read_all if reader is None else reader
+        self._idle = idle
+        self._currents = currents
+        self._voltage = voltage
+        self._offset = sleep_memory_offset
+        self._state_ns = [0, 0, 0]
+        self._samples = 0
+        self._state = STATE_IDLE
+        self._since = time.monotonic_ns()
+        self._next = self._since
+        if idle == IDLE_LOW_POWER:
+            sensor.enable_low_power_mode(True)
+        self._load_sleep_memory()
+
+    def _enter(self, state):
+        """Account the time spent in the current state and switch to another."""
+        now = time.monotonic_ns()
+        self._state_ns[self._state] += now - self._since
+        self._state = state
+        self._since = now
+
+    def acquire(self):
+        """
+        Wake the sensor, take one frame and return it to the idle state.
+
+        :return: The frame returned by the reader
+        """
+        sensor = self._sensor
+        self._enter(STATE_ACTIVE)
+        if self._idle == IDLE_SHUTDOWN:
+            sensor.wake()
+        try:
+            frame = self._reader()
+        finally:
+            if self._idle == IDLE_SHUTDOWN:
+                sensor.shutdown()
+                self._enter(STATE_SLEEP)
+            else:
+                self._enter(STATE_IDLE)
+        self._samples += 1
+        return frame
+
+    def sleep(self):
+        """
+        Sleep the host until the next sample is due.
+
+        Uses ``alarm.light_sleep_until_alarms()`` when available, otherwise
+        ``time.sleep()``. Periods that were overrun are skipped rather than
+        bunched together.
+        """
+        now = time.monotonic_ns()
+        self._next += self._period_ns
+        if self._next < now:
+            self._next = now + self._period_ns - (now - self._next) % self._period_ns
+        remaining = (self._next - now) / 1e9
+        if alarm is not None:
+            alarm.light_sleep_until_alarms(
+                alarm.time.TimeAlarm(monotonic_time=time.monotonic() + remaining)
+            )
+        else:
+            time.sleep(remaining)
+
+    def run(self, count=None, callback=None):
+        """
+        Acquire frames at the sampling period.
+
+        :param count: Number of frames to acquire (default: run forever)
+        :param callback: Optional callable receiving each frame
+        """
+        taken = 0
+        while count is None or taken < count:
+            frame = self.acquire()
+            if callback is not None:
+                callback(frame)
+            taken += 1
+            if count is None or taken < count:
+                self.sleep()
+
+    def deep_sleep(self):
+        """
+        Save the accounting and deep sleep the board until the next sample is due.
+
+        The sensor is left in its idle state. On wake the board restarts
+        ``code.py``; construct the scheduler again with the same
+        ``sleep_memory_offset`` to continue the accounting.
+
+        :raises RuntimeError: If the alarm module is not available
+        """
+        if alarm is None:
+            raise RuntimeError("Deep sleep requires the alarm module.")
+        self._enter(self._state)
+        elapsed = time.monotonic_ns() - self._next
+        remaining = max(0, self._period_ns - elapsed) / 1e9
+        # The sensor stays in its idle state for the whole deep sleep
+        self._state_ns[self._state] += int(remaining * 1e9)
+        struct.pack_into(
+            _SLEEP_MEMORY_FORMAT,
+            alarm.sleep_memory,
+            self._offset,
+            _SLEEP_MEMORY_MAGIC,
+            self._state_ns[STATE_ACTIVE],
+            self._state_ns[STATE_IDLE],
+            self._state_ns[STATE_SLEEP],
+            self._samples,
+        )
+        alarm.exit_and_deep_sleep_until_alarms(
+            alarm.time.TimeAlarm(monotonic_time=time.monotonic() + remaining)
+        )
+
+    def _load_sleep_memory(self):
+        """Restore the accounting saved by deep_sleep(), if any."""
+        if alarm is None or not isinstance(alarm.wake_alarm, alarm.time.TimeAlarm):
+            return
+        saved = struct.unpack_from(
+            _SLEEP_MEMORY_FORMAT, alarm.sleep_memory, self._offset
+        )
+        if saved[0] != _SLEEP_MEMORY_MAGIC:
+            return
+        self._state_ns[STATE_ACTIVE] = saved[1]
+        self._state_ns[STATE_IDLE] = saved[2]
+        self._state_ns[STATE_SLEEP] = saved[3]
+        self._samples = saved[4]
+
+    @property
+    def samples(self):
+        """
+        The number of frames acquired.
+
+        :return: Frame count
+        """
+        return self._samples
+
+    @property
+    def state_times(self):
+        """
+        Time spent in each power state.
+
+        :return: Tuple of (active, idle, sleep) seconds
+        """
+        self._enter(self._state)
+        return tuple(ns / 1e9 for ns in self._state_ns)
+
+    @property
+    def duty_cycle(self):
+        """
+        The fraction of time the sensor spent actively measuring.
+
+        :return: Duty cycle between 0.0 and 1.0
+        """
+        times = self.state_times
+        total = sum(times)
+        return times[STATE_ACTIVE] / total if total else 0.0
+
+    @property
+    def charge(self):
+        """
+        Estimated charge drawn by the sensor.
+
+        :return: Charge in microampere-hours
+        """
+        times = self.state_times
+        return sum(ma * t for ma, t in zip(self._currents, times)) * 1000 / 3600
+
+    @property
+    def energy(self):
+        """
+        Estimated energy used by the sensor.
+
+        :return: Energy in millijoules
+        """
+        times = self.state_times
+        return sum(ma * t for ma, t in zip(self._currents, times)) * self._voltage
+
+    @property
+    def average_current(self):
+        """
+        Estimated average sensor current at the observed duty cycle.
+
+        :return: Average current in mA
+        """
+        times = self.state_times
+        total = sum(times)
+        if not total:
+            return 0.0
+        return sum(ma * t for ma, t in zip(self._currents, times)) / total
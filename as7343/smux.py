@@ -0,0 +1,209 @@
+# SPDX-FileCopyrightText: 2025 Joe Pardue
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`as7343.smux`
+================================================================================
+
+SMUX program lookup and planner for reading channel subsets.
+
+:func:`compile_assignment` is the single source of SMUX images for a
+declarative channel-to-ADC assignment: it validates the assignment and returns
+the image of the predefined SMUX_* mode with that routing, together with the
+label to data register map of the assigned channels. Only the predefined
+images are known to work on hardware, so an assignment must be the routing of
+a predefined mode, or part of one.
+
+The AS7343 has six ADCs, so each integration can read at most six channels.
+:class:`SmuxPlanner` takes the set of channel labels an application needs and
+picks the fewest predefined SMUX_* modes that cover it. Channels spread over
+several modes take one integration per mode, even when six ADCs would be
+enough for the set: combining them in one cycle would need computed SMUX
+images, which are not available for the AS7343 (see below). Plans are cached
+by channel set, so repeated subset reads cost only the measurement itself.
+
+Other routings, including binning several channels on one ADC, would need a
+model of the AS7343 SMUX RAM (which photodiode each 4-bit field routes). No
+model checked against the predefined images is available, so such routings are
+rejected rather than compiled from a guessed layout.
+
+* Author(s): Joe Pardue
+"""
+
+from . import CHANNEL_LABELS, SMUX_VISIBLE, SMUX_NIR, SMUX_FZF5, _SMUX_MODES
+
+ADC_COUNT = 6  #: Number of ADCs (channels per integration cycle)
+SMUX_SIZE = 20  #: Size of a SMUX image in bytes
+
+_DATA_START = 0x95  # Data register of ADC 0
+
+_compiled = {}
+
+
+def _routing_key(pairs):
+    """Return the canonical form of (label, adc) pairs."""
+    return tuple(sorted(pairs, key=lambda pair: (pair[1], pair[0])))
+
+
+# Routing of each predefined mode, mapped to its image
+_BUILTIN = tuple(
+    (
+        frozenset(
+            (label, (register - _DATA_START) // 2) for label, register in mode["map"]
+        ),
+        mode["smux"],
+    )
+    for mode in _SMUX_MODES.values()
+)
+
+
+def compile_assignment(assignment):
+    """
+    Compile a declarative channel-to-ADC assignment into a SMUX program.
+
+    The assignment must be the routing of a predefined SMUX_* mode, or a subset
+    of one; the other channels of that mode are still routed but left out of
+    the label map. Programs are cached by assignment and the results are
+    immutable, so they can be shared freely between sensors.
+
+    :param assignment: Dictionary of ``label: adc`` or a sequence of
+        ``(label, adc)`` pairs, with ADC indices 0-5
+    :return: Tuple of (20-byte SMUX image, ((label, register_address), ...))
+        ordered by ADC
+    :raises ValueError: If a label is unknown or assigned twice, an ADC index
+        is out of range or shared, or no predefined mode has the routing
+    """
+    pairs = assignment.items() if isinstance(assignment, dict) else assignment
+    key = _routing_key(pairs)
+    program = _compiled.get(key)
+    if program is not None:
+        return program
+    labels = set()
+    adcs = set()
+    for label, adc in key:
+        if label not in CHANNEL_LABELS:
+            raise ValueError(f"Unknown channel: {label}")
+        if adc not in range(ADC_COUNT):
+            raise ValueError(f"Invalid ADC for {label}: {adc}")
+        if label in labels:
+            raise ValueError(f"Channel assigned to more than one ADC: {label}")
+        if adc in adcs:
+            raise ValueError(f"More than one channel assigned to ADC {adc}.")
+        labels.add(label)
+        adcs.add(adc)
+    for routing, image in _BUILTIN:
+        if routing.issuperset(key):
+            break
+    else:
+        raise ValueError("No predefined SMUX mode has this routing.")
+    label_map = tuple((label, _DATA_START + 2 * adc) for label, adc in key)
+    program = (image, label_map)
+    _compiled[key] = program
+    return program
+
+
+def compile_channels(labels):
+    """
+    Compile a SMUX program routing up to six channels to ADC 0, 1, 2, ...
+
+    :param labels: Sequence of channel labels, in ADC order
+    :return: Tuple of (20-byte SMUX image, ((label, register_address), ...))
+    :raises ValueError: If there are too many channels, a label is unknown, or
+        no predefined mode has the routing
+    """
+    if len(labels) > ADC_COUNT:
+        raise ValueError(f"At most {ADC_COUNT} channels fit in one SMUX cycle.")
+    return compile_assignment([(label, adc) for adc, label in enumerate(labels)])
+
+
+def _cover(modes, wanted, limit):
+    """Return the smallest combination of modes (at most limit) covering wanted."""
+    for size in range(1, limit + 1):
+        combo = _search(modes, wanted, size, 0)
+        if combo is not None:
+            return combo
+    return None
+
+
+def _search(modes, wanted, size, start):
+    """Depth-first search for ``size`` modes from ``start`` that cover wanted."""
+    if not wanted:
+        return ()
+    if size == 0:
+        return None
+    for i in range(start, len(modes)):
+        name, labels = modes[i]
+        if not wanted & labels:
+            continue
+        rest = _search(modes, wanted - labels, size - 1, i + 1)
+        if rest is not None:
+            return (name,) + rest
+    return None
+
+
+class SmuxPlanner:
+    """
+    Plan and read channel subsets with the fewest predefined SMUX modes.
+
+    :param sensor: The :class:`~as7343.AS7343` to read from
+    """
+
+    def __init__(self, sensor):
+        self._sensor = sensor
+        self._builtin = tuple(
+            (mode, sensor.get_smux_map(mode))
+            for mode in (SMUX_VISIBLE, SMUX_NIR, SMUX_FZF5)
+        )
+        self._plans = {}
+
+    def plan(self, labels):
+        """
+        Return the cached measurement plan for a set of channels.
+
+        :param labels: Iterable of channel labels
+        :return: Tuple of (SMUX mode name, ((label, register), ...)) steps, one
+            per integration cycle
+        :raises ValueError: If a label is unknown or no channels are requested
+        """
+        wanted = frozenset(labels)
+        plan = self._plans.get(wanted)
+        if plan is not None:
+            return plan
+        if not wanted:
+            raise ValueError("No channels requested.")
+        for label in wanted:
+            if label not in CHANNEL_LABELS:
+                raise ValueError(f"Unknown channel: {label}")
+        modes = [
+            (mode, frozenset(label for label, _ in label_map))
+            for mode, label_map in self._builtin
+        ]
+        maps = dict(self._builtin)
+        plan = tuple(
+            (mode, tuple(entry for entry in maps[mode] if entry[0] in wanted))
+            for mode in _cover(modes, wanted, len(modes))
+        )
+        self._plans[wanted] = plan
+        return plan
+
+    def cycles(self, labels):
+        """
+        Return the number of integration cycles needed for a set of channels.
+
+        :param labels: Iterable of channel labels
+        :return: Number of SMUX configurations in the plan
+        """
+        return len(self.plan(labels))
+
+    def read(self, labels):
+        """
+        Measure a set of channels with one integration per planned mode.
+
+        :param labels: Iterable of channel labels
+        :return: Dictionary of channel labels mapping to values
+        """
+        data = {}
+        for config, label_map in self.plan(labels):
+            data.update(self._sensor.read_smux_config(config, label_map))
+        return data
@@ -0,0 +1,234 @@
+# SPDX-FileCopyrightText: 2025 Joe Pardue
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`as7343.stats`
+================================================================================
+
+Streaming per-channel statistics for oversampling and noise reduction.
+
+:class:`FrameStatistics` consumes frames one at a time and keeps the running
+mean, variance, minimum and maximum of every channel in fixed, preallocated
+storage, so averaging a long window costs O(1) memory regardless of its length.
+
+Two arithmetic modes are available:
+
+* **Floating point** (default) uses Welford's algorithm, or an exponentially
+  weighted mean/variance when ``decay`` is given.
+* **Integer** (``integer=True``) uses only integer arithmetic in the update
+  path, for boards without an FPU. Results are fixed-point values with
+  ``frac_bits`` fractional bits, and ``decay`` is rounded to the nearest power
+  of two so the exponential mode is a shift.
+
+* Author(s): Joe Pardue
+"""
+
+import math
+from array import array
+
+from . import CHANNEL_LABELS
+from ._frame import frame_values
+
+
+class FrameStatistics:
+    """
+    Running per-channel mean, variance, minimum and maximum.
+
+    :param decay: Optional smoothing factor (0 < decay <= 1) for exponential
+        decay mode. When omitted every frame is weighted equally.
+    :param reset_on_read: Reset the accumulator after each :meth:`read`
+        (default: False)
+    :param integer: Use integer/fixed-point arithmetic only (default: False)
+    :param frac_bits: Fractional bits of integer-mode results (default: 8)
+    :param labels: Channel labels, in frame order (default: CHANNEL_LABELS)
+    :raises ValueError: If decay is out of range
+    """
+
+    def __init__(
+        self,
+        decay=None,
+        reset_on_read=False,
+        integer=False,
+        frac_bits=8,
+        labels=CHANNEL_LABELS,
+    ):
+        if decay is not None and not 0 < decay <= 1:
+            raise ValueError("Decay must be between 0 and 1.")
+        self._labels = labels
+        self._size = size = len(labels)
+        self._decay = decay
+        self._reset_on_read = reset_on_read
+        self._integer = integer
+        self._frac_bits = frac_bits
+        if integer:
+            self._shift = None
+            if decay is not None:
+                self._shift = max(0, round(-math.log(decay) / math.log(2)))
+            self._mean = [0] * size  # Sum, or fixed-point EW mean
+            self._m2 = [0] * size  # Sum of squares, or fixed-point EW variance
+        else:
+            self._mean = array("f", bytes(4 * size))
+            self._m2 = array("f", bytes(4 * size))
+        self._min = [0] * size
+        self._max = [0] * size
+        self._values = [0] * size
+        self._count = 0
+
+    @property
+    def count(self):
+        """
+        The number of frames accumulated since the last reset.
+
+        :return: Frame count
+        """
+        return self._count
+
+    def reset(self):
+        """Clear all accumulated statistics."""
+        for i in range(self._size):
+            self._mean[i] = 0
+            self._m2[i] = 0
+        self._count = 0
+
+    def update(self, frame):
+        """
+        Add one frame to the statistics.
+
+        :param frame: Dictionary from read_all() or a list in label order
+        """
+        values = frame_values(frame, self._values, self._labels)
+        self._count += 1
+        n = self._count
+        mean = self._mean
+        m2 = self._m2
+        if n == 1:
+            for i in range(self._size):
+                self._min[i] = self._max[i] = values[i]
+        else:
+            for i in range(self._size):
+                val = values[i]
+                if val < self._min[i]:
+                    self._min[i] = val
+                elif val > self._max[i]:
+                    self._max[i] = val
+        if self._integer:
+            shift = self._shift
+            if shift is None:
+                for i in range(self._size):
+                    val = values[i]
+                    mean[i] += val
+                    m2[i] += val * val
+            else:
+                frac = self._frac_bits
+                for i in range(self._size):
+                    scaled = values[i] << frac
+                    if n == 1:
+                        mean[i] = scaled
+                        continue
+                    delta = scaled - mean[i]
+                    mean[i] += delta >> shift
+                    # var = (1 - a) * (var + a * d^2), rearranged into shifts
+                    spread = (delta * delta) >> frac
+                    m2[i] += (spread - (spread >> shift) - m2[i]) >> shift
+            return
+        alpha = self._decay
+        if alpha is None:
+            for i in range(self._size):
+                val = values[i]
+                delta = val - mean[i]
+                mean[i] += delta / n
+                m2[i] += delta * (val - mean[i])
+        else:
+            for i in range(self._size):
+                if n == 1:
+                    mean[i] = values[i]
+                    continue
+                delta = values[i] - mean[i]
+                step = alpha * delta
+                mean[i] += step
+                m2[i] = (1 - alpha) * (m2[i] + delta * step)
+
+    def mean(self, index):
+        """
+        Return the mean of one channel.
+
+        In integer mode this is a fixed-point value with ``frac_bits``
+        fractional bits.
+
+        :param index: Channel index in label order
+        :return: Mean value
+        """
+        if not self._count:
+            return 0
+        if self._integer and self._shift is None:
+            return (self._mean[index] << self._frac_bits) // self._count
+        return self._mean[index]
+
+    def variance(self, index):
+        """
+        Return the variance of one channel.
+
+        Equal-weight mode returns the sample variance. In integer mode this is
+        a fixed-point value with ``frac_bits`` fractional bits.
+
+        :param index: Channel index in label order
+        :return: Variance
+        """
+        n = self._count
+        if n < 2:
+            return 0
+        if self._integer:
+            if self._shift is None:
+                total = self._mean[index]
+                spread = n * self._m2[index] - total * total
+                return (spread << self._frac_bits) // (n * (n - 1))
+            return self._m2[index]
+        if self._decay is None:
+            return self._m2[index] / (n - 1)
+        return self._m2[index]
+
+    def minimum(self, index):
+        """
+        Return the smallest value seen on one channel.
+
+        :param index: Channel index in label order
+        :return: Minimum raw value
+        """
+        return self._min[index]
+
+    def maximum(self, index):
+        """
+        Return the largest value seen on one channel.
+
+        :param index: Channel index in label order
+        :return: Maximum raw value
+        """
+        return self._max[index]
+
+    def means(self, out=None):
+        """
+        Return the means of all channels in label order.
+
+        :param out: Optional preallocated list to fill
+        :return: List of means
+        """
+        if out is None:
+            out = [0] * self._size
+        for i in range(self._size):
+            out[i] = self.mean(i)
+        return out
+
+    def read(self):
+        """
+        Return a snapshot of the statistics, resetting if reset_on_read is set.
+
+        :return: Dictionary mapping each label to (mean, variance, min, max)
+        """
+        result = {
+            label: (self.mean(i), self.variance(i), self._min[i], self._max[i])
+            for i, label in enumerate(self._labels)
+        }
+        if self._reset_on_read:
+            self.reset()
+        return result
@@ -0,0 +1,180 @@
+# SPDX-FileCopyrightText: 2025 Joe Pardue
+#
+# SPDX-License-Identifier: MIT
+
+"""
+`as7343.thresholds`
+================================================================================
+
+Per-channel alarm bands with hysteresis and persistence.
+
+A band specification is compiled once into flat lists, and each frame is then
+evaluated in a single pass that only reports edges: a channel *entering* alarm
+(leaving its band) or *leaving* alarm (returning inside the band, less the
+hysteresis). Steady state produces no events and no allocation.
+
+One band can additionally be offloaded to the chip's spectral threshold
+interrupt (see :meth:`ThresholdEngine.offload`), so the sensor can watch it and
+raise INT or wake from SAI while the host sleeps.
+
+* Author(s): Joe Pardue
+"""
+
+from . import CHANNEL_LABELS, SMUX_VISIBLE, SMUX_NIR, SMUX_FZF5
+
+ENTER = "ENTER"  #: Event: channel went outside its band (alarm raised)
+LEAVE = "LEAVE"  #: Event: channel returned inside its band (alarm cleared)
+
+_DATA_START = 0x95  # Data register of ADC 0
+_NO_LIMIT = float("inf")
+
+
+class ThresholdEngine:
+    """
+    Evaluate per-channel high/low bands on each frame.
+
+    ``bands`` maps a channel label to ``(low, high)``, ``(low, high,
+    hysteresis)`` or ``(low, high, hysteresis, persistence)``. Either limit may
+    be None for a one-sided band. A channel enters alarm after ``persistence``
+    consecutive frames outside ``[low, high]`` and leaves it after
+    ``persistence`` consecutive frames inside ``[low + hysteresis, high -
+    hysteresis]``.
+
+    :param bands: Dictionary of band specifications per channel label
+    :raises ValueError: If a label is unknown or a band is malformed
+    """
+
+    def __init__(self, bands):
+        labels = []
+        index = []
+        enter_low = []
+        enter_high = []
+        leave_low = []
+        leave_high = []
+        persistence = []
+        for label, spec in bands.items():
+            if label not in CHANNEL_LABELS:
+                raise ValueError(f"Unknown channel: {label}")
+            if not 2 <= len(spec) <= 4:
+                raise ValueError(f"Invalid band for {label}: {spec}")
+            low, high = spec[0], spec[1]
+            hysteresis = spec[2] if len(spec) > 2 else 0
+            count = spec[3] if len(spec) > 3 else 1
+            low = -_NO_LIMIT if low is None else low
+            high = _NO_LIMIT if high is None else high
+            if low > high or hysteresis < 0 or low + hysteresis > high - hysteresis:
+                raise ValueError(f"Invalid band for {label}: {spec}")
+            labels.append(label)
+            index.append(CHANNEL_LABELS.index(label))
+            enter_low.append(low)
+            enter_high.append(high)
+            leave_low.append(low + hysteresis)
+            leave_high.append(high - hysteresis)
+            persistence.append(max(1, count))
+        self._labels = tuple(labels)
+        self._index = tuple(index)
+        self._enter_low = enter_low
+        self._enter_high = enter_high
+        self._leave_low = leave_low
+        self._leave_high = leave_high
+        self._persistence = persistence
+        self._pending = [0] * len(labels)
+        self._active = bytearray(len(labels))
+        self._events = []
+        self._hardware = None
+
+    def evaluate(self, frame):
+        """
+        Evaluate one frame and return the alarm edges it caused.
+
+        The returned list is reused by the next call; copy it if it must be
+        kept.
+
+        :param frame: Dictionary from read_all() or a list in
+            :data:`~as7343.CHANNEL_LABELS` order
+        :return: List of (label, ENTER or LEAVE, value) tuples
+        """
+        events = self._events
+        del events[:]
+        by_label = isinstance(frame, dict)
+        active = self._active
+        pending = self._pending
+        for b, label in enumerate(self._labels):
+            if by_label:
+                val = frame.get(label)
+                if val is None:
+                    continue
+            else:
+                val = frame[self._index[b]]
+            if active[b]:
+                changed = self._leave_low[b] <= val <= self._leave_high[b]
+            else:
+                changed = val < self._enter_low[b] or val > self._enter_high[b]
+            if not changed:
+                pending[b] = 0
+                continue
+            pending[b] += 1
+            if pending[b] >= self._persistence[b]:
+                pending[b] = 0
+                active[b] ^= 1
+                events.append((label, ENTER if active[b] else LEAVE, val))
+        return events
+
+    def is_active(self, label):
+        """
+        Check whether a channel is currently in alarm.
+
+        :param label: Channel label
+        :return: True if the channel is in alarm
+        :raises ValueError: If the channel has no band
+        """
+        return bool(self._active[self._labels.index(label)])
+
+    def reset(self):
+        """Clear all alarm states and persistence counters."""
+        for b in range(len(self._labels)):
+            self._pending[b] = 0
+            self._active[b] = 0
+
+    @property
+    def hardware_band(self):
+        """
+        The band currently offloaded to the sensor.
+
+        :return: Tuple of (label, SMUX mode), or None if nothing is offloaded
+        """
+        return self._hardware
+
+    def offload(self, sensor, mode=None):
+        """
+        Offload the first band the chip can watch to its threshold interrupt.
+
+        The chip watches a single ADC of the loaded SMUX cycle, so the band is
+        only monitored in hardware while ``mode`` is the active SMUX mode (for
+        example between read_smux_mode() calls or while sleeping with SAI).
+        Hysteresis is not available in hardware; the outer band limits and the
+        persistence count are programmed. Software evaluation is unaffected.
+
+        :param sensor: The :class:`~as7343.AS7343` to program
+        :param mode: SMUX mode to consider (default: all built-in modes)
+        :return: Tuple of (label, SMUX mode) offloaded, or None if no band fits
+        """
+        modes = (SMUX_VISIBLE, SMUX_NIR, SMUX_FZF5) if mode is None else (mode,)
+        for b, label in enumerate(self._labels):
+            for smux_mode in modes:
+                for mapped, reg in sensor.get_smux_map(smux_mode):
+                    if mapped != label:
+                        continue
+                    low = self._enter_low[b]
+                    high = self._enter_high[b]
+                    low = 0 if low <= 0 else min(0xFFFF, int(low))
+                    high = 0xFFFF if high >= 0xFFFF else max(0, int(high))
+                    sensor.set_spectral_threshold(
+                        low,
+                        high,
+                        (reg - _DATA_START) // 2,
+                        min(60, self._persistence[b]),
+                    )
+                    self._hardware = (label, smux_mode)
+                    return self._hardware
+        return None
@@ -41,10 +41,11 @@ try:
     print("PASS Wake executed")
     time.sleep(0.2)
     
-    # Restore settings (they may be lost after shutdown)
-    sensor.gain = GAIN_4X
-    sensor.integration_time = 50000
-    print("PASS Settings restored after wake")
+    # wake() reapplies the configuration snapshot automatically
+    if sensor.verify_config() and sensor.gain == GAIN_4X:
+        print("PASS Settings restored after wake")
+    else:
+        print("FAIL Settings not restored after wake")
     
     # Test measurement after wake
     wake_data = sensor.read_all()
@@ -74,9 +75,10 @@ try:
         print(f"    Wake complete")
         time.sleep(0.1)
         
-        # Restore and test
-        sensor.gain = GAIN_4X
-        sensor.integration_time = 50000
+        # wake() reapplies the configuration snapshot automatically
+        if not sensor.verify_config():
+            print(f"    FAIL Configuration not restored")
+            break
         
         # Quick measurement test
         try:
@@ -198,9 +200,10 @@ try:
             sensor.wake()
             time.sleep(0.05)
             
-            # Quick settings restore
-            sensor.gain = GAIN_4X
-            sensor.integration_time = 50000
+            # wake() restores the configuration; check it
+            if not sensor.verify_config():
+                print(f"  Cycle {i+1} failed: configuration not restored")
+                break
             
             # Quick test measurement
             sensor.start_measurement()
@@ -35,6 +35,16 @@ __repo__ = "https://github.com/joepardue/CircuitPython_AS7343.git"
 
 # I2C Address
 _AS7343_I2C_ADDR = 0x39
+_AS7343_PART_ID = 0x81
+
+# Startup
+_DEFAULT_GAIN = 0x03  # GAIN_4X
+_DEFAULT_INTEGRATION_US = 150000
+_RESET_TIMEOUT = 1.0  # Seconds to wait for the device after a software reset
+_RESET_POLL = 0.001  # Seconds between readiness polls
+_WAKE_SETTLE = 0.0002  # Seconds for the oscillator to start after PON
+_WTIME_STEP_US = 2780  # Wait time step in microseconds
+_DATA_POLL = 0.001  # Seconds between data-valid polls
 
 # Register addresses
 _ENABLE = 0x80
@@ -49,18 +59,77 @@ _CONTROL = 0xFA
 _STATUS4 = 0xBC
 _DATA_START = 0x95
 _ASTATUS = 0x94
+_STATUS2 = 0x90
+_AZ_CONFIG = 0xDE
+_FD_CFG0 = 0xD7
+_FD_TIME_1 = 0xE0
+_FD_TIME_2 = 0xE2
+_FD_STATUS = 0xE3
+_FIFO_LVL = 0xFD
+_FDATA = 0xFE
+_STATUS = 0x93
+_SP_TH_L = 0x84
+_SP_TH_H = 0x86
+_PERS = 0xCF
+_INTENAB = 0xF9
+_CFG12 = 0x66  # In the 0x20-0x7F register bank
+_ID = 0x5A  # In the 0x20-0x7F register bank
 
 # Enable flags
 _ENABLE_PON = 0x01  # Power ON
 _ENABLE_SP_EN = 0x02  # Spectral Measurement Enable
 _ENABLE_WEN = 0x08  # Wait Enable
+_ENABLE_FDEN = 0x40  # Flicker Detection Enable
 _CONTROL_SW_RESET = 0x08  # Software Reset
+_CONTROL_FIFO_CLR = 0x02  # Clear FIFO
+
+# Flicker detection flags
+_FD_FIFO_WRITE = 0x80  # Bit 7 in FD_CFG0 (write raw flicker samples to FIFO)
+_FD_MEASUREMENT_VALID = 0x20
+_FD_SATURATION = 0x10
+_FD_120HZ_VALID = 0x08
+_FD_100HZ_VALID = 0x04
+_FD_120HZ = 0x02
+_FD_100HZ = 0x01
+_ASTEP_US = 2.78  # Spectral integration time step in microseconds
+_FD_STEP_US = 2.78  # Flicker integration time step in microseconds
+_FIFO_CHUNK = 32  # Maximum FIFO entries drained per I2C transaction
+
+# Spectral threshold interrupt flags
+_REG_BANK = 0x10  # Bit 4 in CFG0 (access registers 0x20-0x7F)
+_SP_IEN = 0x08  # Bit 3 in INTENAB
+_STATUS_AINT = 0x08  # Bit 3 in STATUS
 
 # Low power and interrupt flags
 _LOW_POWER_BIT = 0x20  # Bit 5 in CFG0
 _SAI_BIT = 0x10  # Bit 4 in CFG3 (Sleep After Interrupt)
 _CLEAR_SAI_ACT = 0x01  # Bit 0 in CONTROL
 _SAI_ACTIVE = 0x02  # Bit 1 in STATUS4
+_AVALID = 0x40  # Bit 6 in STATUS2 (spectral data valid)
+
+# Register write batching: writes to these registers change how later writes
+# are interpreted (bank select, SMUX config mode, enables) or trigger an action,
+# so they are sent in program order and never merged
+_ORDERED_REGISTERS = (_CFG0, _ENABLE, _CONTROL, _INTENAB, _STATUS, _FD_STATUS)
+# Writes to these registers are commands, so reads are never served from them
+_COMMAND_REGISTERS = (_CONTROL, _STATUS, _FD_STATUS)
+
+# I2C retry policy
+_DEFAULT_RETRIES = 2  # Retries of a failed transfer before giving up
+_RETRY_DELAY = 0.001  # First backoff delay in seconds, doubled per retry
+_RETRY_MAX_DELAY = 0.02  # Longest backoff delay in seconds
+
+# Dark frame cache
+_DARK_CACHE_SIZE = 8  # Number of (gain, integration time) dark frames kept
+
+# Upper bounds of the read_all() latency histogram buckets in milliseconds
+_LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Flicker detection results
+FLICKER_NONE = 0  #: No 100 Hz or 120 Hz flicker detected
+FLICKER_100HZ = 100  #: 100 Hz flicker detected (50 Hz mains)
+FLICKER_120HZ = 120  #: 120 Hz flicker detected (60 Hz mains)
+FLICKER_UNKNOWN = -1  #: Detection not yet valid, or the flicker ADC saturated
 
 # Gain values
 GAIN_0_5X = 0x00  #: 0.5x gain setting
@@ -82,6 +151,143 @@ SMUX_VISIBLE = "VISIBLE"  #: SMUX configuration for visible light channels (F1-F
 SMUX_NIR = "NIR"  #: SMUX configuration for NIR channels (F6-F8, FXL, NIR, CLR)
 SMUX_FZF5 = "FZF5"  #: SMUX configuration for additional channels (FZ, F5)
 
+#: Spectral channel labels in the standard order used by :attr:`AS7343.channels`
+CHANNEL_LABELS = (
+    "F1",
+    "F2",
+    "FZ",
+    "F3",
+    "F4",
+    "F5",
+    "FY",
+    "FXL",
+    "F6",
+    "F7",
+    "F8",
+    "NIR",
+    "CLR",
+)
+
+# SMUX configurations for all channel groups, shared by every instance
+_SMUX_MODES = {
+    SMUX_VISIBLE: {
+        "smux": b"\x00\x00\x00\x00\x00\x00\x00\x00\x00\x01"
+        b"\x02\x04\x08\x00\x10\x00\x00\x00\x00\x00",
+        "map": (
+            ("F1", 0x95),
+            ("F2", 0x97),
+            ("F3", 0x99),
+            ("F4", 0x9B),
+            ("FY", 0x9D),
+        ),
+    },
+    SMUX_NIR: {
+        "smux": b"\x00\x00\x00\x00\x00\x00\x00\x00\x00\x40"
+        b"\x02\x10\x20\x00\x80\x04\x00\x00\x00\x00",
+        "map": (
+            ("F6", 0x95),
+            ("F7", 0x97),
+            ("F8", 0x99),
+            ("FXL", 0x9B),
+            ("NIR", 0x9D),
+            ("CLR", 0x9F),
+        ),
+    },
+    SMUX_FZF5: {
+        "smux": b"\x00\x00\x00\x00\x00\x00\x00\x00\x00\x40"
+        b"\x02\x10\x04\x00\x80\x01\x00\x00\x00\x00",
+        "map": (("FZ", 0x95), ("F5", 0x97)),
+    },
+}
+
+
+# Precomputed (ATIME, ASTEP) for common integration times beyond 65535 steps
+_TIMING_TABLE = {
+    200000: (1, 35970),
+    250000: (1, 44963),
+    300000: (1, 53956),
+    400000: (4, 28776),
+    500000: (2, 59951),
+    750000: (5, 44963),
+    1000000: (5, 59951),
+    1500000: (8, 59951),
+    2000000: (11, 59951),
+    3000000: (22, 46918),
+    5000000: (42, 41826),
+    10000000: (85, 41826),
+    20000000: (150, 47643),
+    30000000: (195, 55057),
+}
+
+
+def _solve_timing(integration_time_us):
+    """
+    Find the ATIME/ASTEP pair closest to an integration time.
+
+    The integration time is (ATIME + 1) * (ASTEP + 1) * 2.78 us. Times up to
+    65535 steps are reached exactly with ATIME = 0. Longer times search every
+    ATIME for the product closest to the request, preferring the larger full
+    scale and then the finer ASTEP resolution.
+
+    :param integration_time_us: Desired integration time in microseconds
+    :return: Tuple of (ATIME, ASTEP)
+    :raises ValueError: If the integration time is out of range
+    """
+    timing = _TIMING_TABLE.get(integration_time_us)
+    if timing is not None:
+        return timing
+    steps = integration_time_us / _ASTEP_US
+    if steps > 256 * 65535 + 0.5:
+        raise ValueError("Integration time too long.")
+    if steps <= 0:
+        raise ValueError("Integration time must be positive.")
+    if steps < 65535.5:
+        return 0, max(0, int(steps + 0.5) - 1)
+    best = None
+    for atime in range(int(steps // 65535), 256):
+        count = min(65535, int(steps / (atime + 1) + 0.5))
+        product = (atime + 1) * count
+        error = abs(product - steps)
+        if best is None or (error, -product) < (best[0], -best[1]):
+            best = (error, product, atime, count - 1)
+    return best[2], best[3]
+
+
+class _Batch:
+    """Context manager collecting register writes until the outermost exit."""
+
+    def __init__(self, sensor):
+        self._sensor = sensor
+
+    def __enter__(self):
+        sensor = self._sensor
+        if not sensor._batch_depth:
+            sensor._pending = []
+        sensor._batch_depth += 1
+        return sensor
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        sensor = self._sensor
+        sensor._batch_depth -= 1
+        if sensor._batch_depth:
+            return
+        if exception_type is None:
+            try:
+                sensor._flush()
+            finally:
+                sensor._pending = None
+                sensor._batch_cfg0 = False
+            return
+        # Drop the rest of a failed batch; CFG0 may have been left in SMUX
+        # configuration mode or another bank by writes already sent
+        sensor._pending = None
+        if sensor._batch_cfg0:
+            sensor._batch_cfg0 = False
+            try:
+                sensor._write_u8(_CFG0, sensor._cfg0)
+            except OSError:
+                pass  # Report the original error
+
 
 class AS7343:
     """
@@ -91,33 +297,378 @@ class AS7343:
     and near-infrared spectrum with 14 distinct channels (F1-F8, FZ, FY, FXL, NIR, CLR).
 
     :param ~busio.I2C i2c: The I2C bus the AS7343 is connected to
+    :param bool force_reset: Always software reset on startup (default: True).
+        When False, the reset is skipped if the device already holds the
+        default configuration, e.g. after a host-only reboot.
+    :param int retries: Retries of a failed I2C transfer, with exponential
+        backoff, before the error is raised (default: 2)
+    :param bool auto_recover: Recover from bus errors and unexpected device
+        resets inside read_all() (default: True)
     """
 
-    def __init__(self, i2c):
+    def __init__(
+        self,
+        i2c,
+        force_reset=True,
+        retries=_DEFAULT_RETRIES,
+        auto_recover=True,
+    ):
         """
         Initialize the AS7343 sensor.
 
         :param ~busio.I2C i2c: The I2C bus the AS7343 is connected to
+        :param bool force_reset: Always software reset on startup (default: True)
+        :param int retries: Retries of a failed I2C transfer (default: 2)
+        :param bool auto_recover: Recover inside read_all() (default: True)
         """
         self.i2c_device = I2CDevice(i2c, _AS7343_I2C_ADDR)
-        self._smux_modes = self._define_smux_modes()
+        self._max_retries = retries
+        self.auto_recover = auto_recover
+        self._pending = None  # Register writes collected by batch()
+        self._batch_depth = 0
+        self._batch_cfg0 = False  # CFG0 written inside the current batch
+        self._batch_context = _Batch(self)
+        self._smux_modes = _SMUX_MODES
         self._last_data = {}
         self._gain = None
         self._integration_time_us = None
-        self.initialize()
-        self.gain = GAIN_4X
-        self.integration_time = 150000
+        self._dark_frames = {}
+        self._dark_keys = []
+        self._dark_subtraction = True
+        self._enable_extra = 0x00
+        self._atime = 0
+        self._astep = 0
+        self._wtime = 0
+        self._cfg0 = 0x00
+        self._cfg3 = None  # Unknown until SAI is configured
+        self._smux_image = None
+        # Settings outside config_snapshot, restored by restore_config() once
+        # set through the driver (None: left at the device value)
+        self._az_config = None
+        self._fd_time = None  # (FD_TIME_1, FD_TIME_2)
+        self._threshold = None  # (SP_TH_L, SP_TH_H, PERS, CFG12)
+        self._intenab = None
+        cycles = len(self._smux_modes)
+        self._cycle_start = [0] * cycles
+        self._cycle_end = [0] * cycles
+        self._channel_cycle = {}
+        for cycle, mode_name in enumerate(self._smux_modes):
+            for label, _ in self._smux_modes[mode_name]["map"]:
+                self._channel_cycle[label] = cycle
+        count = len(CHANNEL_LABELS)
+        self._values = [0] * count
+        self._midpoints = [0] * count
+        self._prev_values = [0] * count
+        self._prev_midpoints = [0] * count
+        self._frame_count = 0
+        self._i2c_errors = 0
+        self._retries = 0
+        self._saturations = 0
+        self._latency_counts = [0] * (len(_LATENCY_BUCKETS_MS) + 1)
+        self._latency_sum_ns = 0
+        self._recoveries = 0
+        self._recovery_ns = 0
+        self._last_recovery_ns = 0
+        self.initialize(force_reset)
+
+    def initialize(self, force_reset=True):
+        """
+        Perform a software reset and apply the default configuration.
+
+        Resets the device to its default state and prepares it for measurements
+        with 4x gain and a 150 ms integration time. Instead of sleeping for a
+        fixed time after the reset, the device ID register is polled until the
+        device responds. The default configuration is written as one batch.
 
-    def initialize(self):
+        :param bool force_reset: Reset even if the device already holds the
+            default configuration (default: True)
+        :return: True if a reset was performed, False if it was skipped
+        :raises RuntimeError: If no AS7343 responds after the reset
+        """
+        atime, astep = _solve_timing(_DEFAULT_INTEGRATION_US)
+        reset = force_reset or not self._holds_default_config(atime, astep)
+        if reset:
+            self._write_u8(_CONTROL, _CONTROL_SW_RESET)
+            self._wait_for_device()
+            with self.batch():
+                self._write_u8(_CFG0, 0x00)
+                self._write_u8(_WTIME, 0x00)
+                self._write_u8(_CFG1, _DEFAULT_GAIN)
+                self._write_u8(_ATIME, atime)
+                self._write_u16(_ASTEP, astep)
+            self._cfg3 = None
+            self._smux_image = None
+            self._az_config = None
+            self._fd_time = None
+            self._threshold = None
+            self._intenab = None
+        self._gain = _DEFAULT_GAIN
+        self._integration_time_us = _DEFAULT_INTEGRATION_US
+        self._atime = atime
+        self._astep = astep
+        self._wtime = 0
+        self._cfg0 = 0x00
+        return reset
+
+    def reset(self):
         """
-        Perform a software reset and basic startup configuration.
+        Software reset the device and restore the current configuration.
 
-        Resets the device to its default state and prepares it for measurements.
+        Unlike initialize(), which returns to the default configuration, this
+        keeps the gain, timing, SMUX and power settings in effect.
+
+        :raises RuntimeError: If no AS7343 responds after the reset
         """
+        snapshot = self.config_snapshot
         self._write_u8(_CONTROL, _CONTROL_SW_RESET)
-        time.sleep(1.0)
-        self._write_u8(_CFG0, 0x00)
-        self._write_u8(_WTIME, 0x00)
+        self._wait_for_device()
+        self.restore_config(snapshot)
+
+    @property
+    def config_snapshot(self):
+        """
+        A snapshot of the current measurement configuration.
+
+        The snapshot covers gain, ATIME/ASTEP, WTIME, the loaded SMUX image and
+        the low-power and SAI bits. It is tracked by the driver, so taking it
+        costs no bus traffic.
+
+        :return: Opaque tuple to pass to restore_config()
+        """
+        return (
+            self._gain,
+            self._integration_time_us,
+            self._atime,
+            self._astep,
+            self._wtime,
+            self._cfg0,
+            self._cfg3,
+            self._smux_image,
+        )
+
+    def restore_config(self, snapshot=None, verify=False):
+        """
+        Write a configuration snapshot back to the device.
+
+        All registers are written while holding the bus once. The auto-zero,
+        flicker timing and spectral threshold settings made through the driver
+        are rewritten as well. This runs automatically in wake(), reset() and
+        recover().
+
+        :param snapshot: Value of config_snapshot to restore (default: the
+            configuration currently tracked by the driver); a CFG3 or SMUX
+            image of None keeps the tracked value, as in apply_config()
+        :param bool verify: Read the registers back afterwards (default: False)
+        :return: True, or the result of verify_config() when verify is set
+        """
+        if snapshot is not None:
+            (
+                self._gain,
+                self._integration_time_us,
+                self._atime,
+                self._astep,
+                self._wtime,
+                self._cfg0,
+                cfg3,
+                smux_image,
+            ) = snapshot
+            if cfg3 is not None:
+                self._cfg3 = cfg3
+            if smux_image is not None:
+                self._smux_image = smux_image
+        self._write_config()
+        if verify:
+            return self.verify_config()
+        return True
+
+    def apply_config(self, snapshot):
+        """
+        Switch to a configuration snapshot, writing only what differs.
+
+        Unlike restore_config(), which rewrites every register, this compares
+        the snapshot with the configuration tracked by the driver and sends the
+        changed registers as one batch (see batch()). Snapshots come from
+        config_snapshot or :class:`~as7343.profiles.Profile`. A CFG3 or SMUX
+        image of None leaves that part of the configuration unchanged.
+
+        :param snapshot: Value of config_snapshot to apply
+        :return: Number of registers written
+        """
+        (
+            gain,
+            integration_time_us,
+            atime,
+            astep,
+            wtime,
+            cfg0,
+            cfg3,
+            smux_image,
+        ) = snapshot
+        if smux_image is None or smux_image == self._smux_image:
+            smux_image = None
+        if cfg3 == self._cfg3:
+            cfg3 = None
+        written = 0
+        with self.batch():
+            if gain != self._gain:
+                self._write_u8(_CFG1, gain)
+                written += 1
+            if atime != self._atime:
+                self._write_u8(_ATIME, atime)
+                written += 1
+            if astep != self._astep:
+                self._write_u16(_ASTEP, astep)
+                written += 2
+            if wtime != self._wtime:
+                self._write_u8(_WTIME, wtime)
+                written += 1
+            if cfg3 is not None:
+                self._write_u8(_CFG3, cfg3)
+                written += 1
+            if smux_image is not None:
+                self._write_u8(_CFG0, cfg0 | 0x10)  # SMUX config mode
+                for i, val in enumerate(smux_image):
+                    self._write_u8(i, val)
+                written += len(smux_image) + 1
+            if smux_image is not None or cfg0 != self._cfg0:
+                self._write_u8(_CFG0, cfg0)
+                written += 1
+        self._gain = gain
+        self._integration_time_us = integration_time_us
+        self._atime = atime
+        self._astep = astep
+        self._wtime = wtime
+        self._cfg0 = cfg0
+        if cfg3 is not None:
+            self._cfg3 = cfg3
+        if smux_image is not None:
+            self._smux_image = smux_image
+        return written
+
+    def _write_config(self):
+        """Write the tracked configuration as one batch."""
+        with self.batch():
+            self._write_u8(_CFG1, self._gain)
+            self._write_u8(_ATIME, self._atime)
+            self._write_u8(_WTIME, self._wtime)
+            self._write_u16(_ASTEP, self._astep)
+            if self._cfg3 is not None:
+                self._write_u8(_CFG3, self._cfg3)
+            if self._az_config is not None:
+                self._write_u8(_AZ_CONFIG, self._az_config)
+            if self._fd_time is not None:
+                self._write_u8(_FD_TIME_1, self._fd_time[0])
+                self._write_u8(_FD_TIME_2, self._fd_time[1])
+            if self._threshold is not None:
+                low, high, persistence, adc = self._threshold
+                self._write_u16(_SP_TH_L, low)
+                self._write_u16(_SP_TH_H, high)
+                self._write_u8(_PERS, persistence)
+                self._write_u8(_CFG0, self._cfg0 | _REG_BANK)
+                self._write_u8(_CFG12, adc)
+            if self._smux_image is not None:
+                self._write_u8(_CFG0, self._cfg0 | 0x10)  # SMUX config mode
+                for i, val in enumerate(self._smux_image):
+                    self._write_u8(i, val)
+            self._write_u8(_CFG0, self._cfg0)
+            if self._intenab is not None:
+                self._write_u8(_INTENAB, self._intenab)
+
+    def recover(self):
+        """
+        Re-establish the device after a bus glitch or an unexpected reset.
+
+        Waits for the device to answer, then restores the tracked
+        configuration (see restore_config()). read_all() calls this
+        automatically when auto_recover is set. Recovery counts and times are reported in metrics.
+
+        :raises RuntimeError: If the device does not answer
+        """
+        started = time.monotonic_ns()
+        self._wait_for_device()
+        self.restore_config()
+        elapsed = time.monotonic_ns() - started
+        self._recoveries += 1
+        self._recovery_ns += elapsed
+        self._last_recovery_ns = elapsed
+
+    def _config_lost(self):
+        """Check two registers whose reset values differ from the tracked ones."""
+        return (
+            self._read_u8(_CFG1) != self._gain or self._read_u16(_ASTEP) != self._astep
+        )
+
+    def verify_config(self):
+        """
+        Check that the device registers match the tracked configuration.
+
+        :return: True if gain, timing, CFG0 and SAI settings match
+        """
+        timing = bytearray(3)  # ATIME, reserved, WTIME
+        self._read_into(_ATIME, timing)
+        return (
+            timing[0] == self._atime
+            and timing[2] == self._wtime
+            and self._read_u8(_CFG1) == self._gain
+            and self._read_u16(_ASTEP) == self._astep
+            and self._read_u8(_CFG0) == self._cfg0
+            and (self._cfg3 is None or self._read_u8(_CFG3) == self._cfg3)
+        )
+
+    def _read_id(self):
+        """Read the part ID register from the upper register bank."""
+        self._write_u8(_CFG0, self._cfg0 | _REG_BANK)
+        part_id = self._read_u8(_ID)
+        self._write_u8(_CFG0, self._cfg0)
+        return part_id
+
+    def _wait_for_device(self):
+        """Poll the ID register until the device answers after a reset."""
+        deadline = time.monotonic() + _RESET_TIMEOUT
+        errors = self._i2c_errors
+        retries = self._max_retries
+        self._max_retries = 0  # The poll itself is the retry loop
+        try:
+            while True:
+                try:
+                    if self._read_id() == _AS7343_PART_ID:
+                        self._i2c_errors = errors  # Expected NACKs are not errors
+                        return
+                except OSError:
+                    pass  # Device NACKs while it is still resetting
+                if time.monotonic() > deadline:
+                    raise RuntimeError("AS7343 not found after reset.")
+                time.sleep(_RESET_POLL)
+        finally:
+            self._max_retries = retries
+
+    def _holds_default_config(self, atime, astep):
+        """
+        Check whether the device is powered with the default configuration.
+
+        CFG0 is read before the ID probe, which switches register banks and
+        leaves CFG0 at its default value. SAI and the interrupt enables are
+        checked too, since the driver would not know about them if the reset
+        were skipped.
+        """
+        try:
+            cfg0 = self._read_u8(_CFG0)
+            if self._read_id() != _AS7343_PART_ID:
+                return False
+        except OSError:
+            return False
+        timing = bytearray(3)  # ATIME, reserved, WTIME
+        self._read_into(_ATIME, timing)
+        return (
+            self._read_u8(_ENABLE) & _ENABLE_PON
+            and timing[0] == atime
+            and timing[2] == 0
+            and cfg0 == 0x00
+            and self._read_u8(_CFG1) == _DEFAULT_GAIN
+            and self._read_u16(_ASTEP) == astep
+            and not self._read_u8(_CFG3) & _SAI_BIT
+            and not self._read_u8(_INTENAB)
+        )
 
     @property
     def gain(self):
@@ -154,6 +705,9 @@ class AS7343:
         Longer integration times provide better results in low light but may
         cause saturation in bright conditions.
 
+        This returns the requested time; see achieved_integration_time for the
+        time actually programmed.
+
         :return: Integration time in microseconds
         """
         return self._integration_time_us
@@ -163,21 +717,89 @@ class AS7343:
         """
         Set the integration time for spectral measurements.
 
+        ATIME and ASTEP are chosen to match the requested time as closely as
+        possible, which allows times up to about 46.6 s. Common times come
+        from a precomputed table.
+
         :param integration_time_us: Desired integration time in microseconds
-        :raises ValueError: If integration time is too long
+        :raises ValueError: If integration time is not positive or too long
+        """
+        atime, astep = _solve_timing(integration_time_us)
+        with self.batch():
+            if atime != self._atime:
+                self._write_u8(_ATIME, atime)
+            self._write_u16(_ASTEP, astep)
+        self._atime = atime
+        self._astep = astep
+        self._integration_time_us = integration_time_us
+
+    @property
+    def achieved_integration_time(self):
         """
-        resolution = 2.78
-        if integration_time_us > (65535 * resolution):
-            raise ValueError("Integration time too long.")
+        The integration time actually programmed in ATIME/ASTEP.
 
-        # Calculate ASTEP with bounds checking
-        astep_value = int((integration_time_us - resolution) / resolution)
-        astep_value = min(astep_value, 65535)
-        astep_value = astep_value & 0xFFFE
+        :return: Integration time in microseconds
+        """
+        return (self._atime + 1) * (self._astep + 1) * _ASTEP_US
 
-        self._write_u8(_ATIME, 0)
-        self._write_u16(_ASTEP, astep_value)
-        self._integration_time_us = integration_time_us
+    @property
+    def cycle_time(self):
+        """
+        The integration time of one SMUX cycle, as programmed in ATIME/ASTEP.
+
+        :return: Integration time in seconds
+        """
+        return (self._atime + 1) * (self._astep + 1) * _ASTEP_US / 1e6
+
+    @property
+    def max_count(self):
+        """
+        The ADC full-scale count for the programmed integration time.
+
+        :return: Maximum count, (ATIME + 1) * (ASTEP + 1) limited to 65535
+        """
+        return min(0xFFFF, (self._atime + 1) * (self._astep + 1))
+
+    def _wait_for_data(self, timeout):
+        """
+        Wait for the current integration to finish.
+
+        Sleeps for the programmed integration time, then polls the data-valid
+        flag for up to ``timeout`` more seconds so that auto-zero and other
+        overheads are covered.
+        """
+        time.sleep(self.cycle_time)
+        deadline = time.monotonic() + timeout
+        while not self._read_u8(_STATUS2) & _AVALID:
+            if time.monotonic() >= deadline:
+                return
+            time.sleep(_DATA_POLL)
+
+    @property
+    def wait_time(self):
+        """
+        The wait time between measurement cycles in microseconds.
+
+        The wait is inserted between cycles while measuring (ENABLE WEN), in
+        steps of 2.78 ms.
+
+        :return: Wait time in microseconds
+        """
+        return (self._wtime + 1) * _WTIME_STEP_US
+
+    @wait_time.setter
+    def wait_time(self, wait_time_us):
+        """
+        Set the wait time between measurement cycles.
+
+        :param wait_time_us: Wait time in microseconds (2780-711680)
+        :raises ValueError: If the wait time is out of range
+        """
+        wtime = (wait_time_us + _WTIME_STEP_US // 2) // _WTIME_STEP_US - 1
+        if wtime not in range(0, 256):
+            raise ValueError("Invalid wait time.")
+        self._write_u8(_WTIME, wtime)
+        self._wtime = wtime
 
     def set_smux_mode(self, mode_name):
         """
@@ -191,18 +813,23 @@ class AS7343:
         """
         if mode_name not in self._smux_modes:
             raise ValueError(f"Invalid SMUX mode: {mode_name}")
-        config = self._smux_modes[mode_name]["smux"]
-        self._write_u8(_CFG0, 0x10)  # Enable SMUX config mode
-        for i, val in enumerate(config):
-            self._write_u8(0x00 + i, val)
-        self._write_u8(_CFG0, 0x00)  # Exit SMUX config mode
+        self._write_smux(self._smux_modes[mode_name]["smux"])
+
+    def _write_smux(self, config):
+        """Write a 20-byte SMUX image to the SMUX configuration registers."""
+        with self.batch():
+            self._write_u8(_CFG0, self._cfg0 | 0x10)  # Enable SMUX config mode
+            for i, val in enumerate(config):
+                self._write_u8(0x00 + i, val)
+            self._write_u8(_CFG0, self._cfg0)  # Exit SMUX config mode
+        self._smux_image = config
 
     def get_smux_map(self, mode_name):
         """
         Get the channel mapping for a specific SMUX mode.
 
         :param mode_name: One of the SMUX_* constants
-        :return: List of (label, register_address) tuples
+        :return: Tuple of (label, register_address) tuples
         :raises ValueError: If an invalid mode name is provided
         """
         if mode_name not in self._smux_modes:
@@ -216,18 +843,108 @@ class AS7343:
         This method takes three separate measurements with different SMUX
         configurations to read all channels, and combines the results.
 
+        With auto_recover set, a bus error that outlasts the retries, or a
+        device reset detected after the frame, triggers recover() and the frame
+        is read again.
+
         :return: Dictionary with channel labels (F1, F2, etc.) mapping to values
+        :raises RuntimeError: If the device cannot be recovered
+        """
+        started = time.monotonic_ns()
+        for attempt in range(2):
+            try:
+                full_data = self._read_all_raw(True)
+                if not self.auto_recover or not self._config_lost():
+                    break
+                if attempt:
+                    raise RuntimeError("AS7343 configuration lost again.")
+            except OSError:
+                if not self.auto_recover or attempt:
+                    raise
+            self.recover()  # Discard the frame and read it again
+        full_scale = self.max_count
+        for value in full_data.values():
+            if value >= full_scale:
+                self._saturations += 1
+                break
+        self._subtract_dark(full_data)
+        self._last_data = full_data
+        self._update_timing(full_data)
+        self._count_frame(time.monotonic_ns() - started)
+        return full_data
+
+    def _count_frame(self, latency_ns):
+        """Update the frame counter and latency histogram."""
+        self._frame_count += 1
+        self._latency_sum_ns += latency_ns
+        bucket = 0
+        for bound in _LATENCY_BUCKETS_MS:
+            if latency_ns <= bound * 1000000:
+                break
+            bucket += 1
+        self._latency_counts[bucket] += 1
+
+    @property
+    def metrics(self):
+        """
+        Operational counters for monitoring.
+
+        The counters are plain integers updated in place, so reading them from
+        another thread needs no locking. See :mod:`as7343.metrics` for
+        Prometheus exposition.
+
+        :return: Dictionary with ``frames``, ``i2c_errors``, ``retries``,
+            ``saturations`` (frames with a channel at full scale),
+            ``latency_buckets`` (bucket upper bounds in seconds),
+            ``latency_counts`` (frames per bucket, the last one unbounded)
+            ``latency_sum`` (total read_all() time in seconds), ``recoveries``,
+            ``recovery_time`` and ``last_recovery_time`` (seconds)
+        """
+        return {
+            "frames": self._frame_count,
+            "i2c_errors": self._i2c_errors,
+            "retries": self._retries,
+            "saturations": self._saturations,
+            "latency_buckets": tuple(ms / 1000 for ms in _LATENCY_BUCKETS_MS),
+            "latency_counts": tuple(self._latency_counts),
+            "latency_sum": self._latency_sum_ns / 1e9,
+            "recoveries": self._recoveries,
+            "recovery_time": self._recovery_ns / 1e9,
+            "last_recovery_time": self._last_recovery_ns / 1e9,
+        }
+
+    def _update_timing(self, data):
+        """Shift the current values and midpoints to the previous frame slots."""
+        for i, label in enumerate(CHANNEL_LABELS):
+            cycle = self._channel_cycle[label]
+            self._prev_values[i] = self._values[i]
+            self._prev_midpoints[i] = self._midpoints[i]
+            self._values[i] = data.get(label, 0)
+            self._midpoints[i] = (
+                self._cycle_start[cycle] + self._cycle_end[cycle]
+            ) // 2
+
+    def _read_all_raw(self, record_timing=False):
+        """
+        Run all SMUX cycles and return the raw counts without dark subtraction.
+
+        Cycle timestamps are only recorded for frames that read_all() returns,
+        so that they stay consistent with the channel midpoints.
         """
         full_data = {}
-        for mode_name in self._smux_modes:
-            self.set_smux_mode(mode_name)
+        for cycle, mode_name in enumerate(self._smux_modes):
             label_map = self._smux_modes[mode_name]["map"]
-            self.start_measurement()
-            time.sleep(0.5)
+            with self.batch():
+                self.set_smux_mode(mode_name)
+                self.start_measurement()
+            start = time.monotonic_ns()
+            self._wait_for_data(0.5)
+            if record_timing:
+                self._cycle_start[cycle] = start
+                self._cycle_end[cycle] = time.monotonic_ns()
             self.stop_measurement()
             for label, reg in label_map:
                 full_data[label] = self._read_u16(reg)
-        self._last_data = full_data
         return full_data
 
     @property
@@ -239,6 +956,74 @@ class AS7343:
         """
         return self._last_data
 
+    @property
+    def cycle_timestamps(self):
+        """
+        Start and end times of each SMUX cycle of the last read_all().
+
+        Channels of one frame come from different cycles, so they can be far
+        apart in time; these timestamps (from ``time.monotonic_ns()``) make the
+        skew explicit.
+
+        :return: Tuple of (start_ns, end_ns) pairs in measurement order
+        """
+        return tuple(zip(self._cycle_start, self._cycle_end))
+
+    @property
+    def frame_timestamp(self):
+        """
+        The acquisition time of the last read_all() frame.
+
+        Frames are plain dictionaries, so their timing stays on the sensor
+        until the next read_all(); pass this along with the frame (as the
+        daemon and exporter do) to keep it.
+
+        :return: Midpoint between the start of the first and the end of the
+            last SMUX cycle, in ``time.monotonic_ns()`` units (0 before the
+            first frame)
+        """
+        return (self._cycle_start[0] + self._cycle_end[-1]) // 2
+
+    def channel_midpoint(self, label):
+        """
+        Return the integration midpoint of one channel in the last read_all().
+
+        :param label: Channel label
+        :return: Midpoint in ``time.monotonic_ns()`` units
+        :raises ValueError: If the label is unknown
+        """
+        return self._midpoints[CHANNEL_LABELS.index(label)]
+
+    def aligned_channels(self, timestamp_ns=None, out=None):
+        """
+        Estimate all channels at one common time.
+
+        Each channel is linearly interpolated between its value in the previous
+        and the last read_all() using the channels' integration midpoints. The
+        default timestamp is the midpoint of the first cycle of the last frame,
+        which lies between the two frames for every channel. Until two frames
+        have been read the last values are returned unchanged.
+
+        :param timestamp_ns: Common time in ``time.monotonic_ns()`` units
+        :param out: Optional preallocated list to fill
+        :return: List of values in :data:`CHANNEL_LABELS` order
+        """
+        if out is None:
+            out = [0] * len(CHANNEL_LABELS)
+        if timestamp_ns is None:
+            timestamp_ns = (self._cycle_start[0] + self._cycle_end[0]) // 2
+        for i in range(len(CHANNEL_LABELS)):
+            value = self._values[i]
+            span = self._midpoints[i] - self._prev_midpoints[i]
+            if self._prev_midpoints[i] and span > 0:
+                prev = self._prev_values[i]
+                value = (
+                    prev
+                    + (value - prev) * (timestamp_ns - self._prev_midpoints[i]) / span
+                )
+            out[i] = value
+        return out
+
     @property
     def channels(self):
         """
@@ -246,119 +1031,7 @@ class AS7343:
 
         :return: List of values in the order: F1, F2, FZ, F3, F4, F5, FY, FXL, F6, F7, F8, NIR, CLR
         """
-        labels = [
-            "F1",
-            "F2",
-            "FZ",
-            "F3",
-            "F4",
-            "F5",
-            "FY",
-            "FXL",
-            "F6",
-            "F7",
-            "F8",
-            "NIR",
-            "CLR",
-        ]
-        return [self._last_data.get(label, 0) for label in labels]
-
-    def _define_smux_modes(self):
-        """
-        Define the SMUX configurations for all channel groups.
-
-        :return: Dictionary of SMUX mode configurations
-        """
-        return {
-            SMUX_VISIBLE: {
-                "smux": [
-                    0,
-                    0,
-                    0,
-                    0,
-                    0,
-                    0,
-                    0,
-                    0,
-                    0,
-                    0x01,
-                    0x02,
-                    0x04,
-                    0x08,
-                    0,
-                    0x10,
-                    0,
-                    0,
-                    0,
-                    0,
-                    0,
-                ],
-                "map": [
-                    ("F1", 0x95),
-                    ("F2", 0x97),
-                    ("F3", 0x99),
-                    ("F4", 0x9B),
-                    ("FY", 0x9D),
-                ],
-            },
-            SMUX_NIR: {
-                "smux": [
-                    0,
-                    0,
-                    0,
-                    0,
-                    0,
-                    0,
-                    0,
-                    0,
-                    0,
-                    0x40,
-                    0x02,
-                    0x10,
-                    0x20,
-                    0,
-                    0x80,
-                    0x04,
-                    0,
-                    0,
-                    0,
-                    0,
-                ],
-                "map": [
-                    ("F6", 0x95),
-                    ("F7", 0x97),
-                    ("F8", 0x99),
-                    ("FXL", 0x9B),
-                    ("NIR", 0x9D),
-                    ("CLR", 0x9F),
-                ],
-            },
-            SMUX_FZF5: {
-                "smux": [
-                    0,
-                    0,
-                    0,
-                    0,
-                    0,
-                    0,
-                    0,
-                    0,
-                    0,
-                    0x40,
-                    0x02,
-                    0x10,
-                    0x04,
-                    0,
-                    0x80,
-                    0x01,
-                    0,
-                    0,
-                    0,
-                    0,
-                ],
-                "map": [("FZ", 0x95), ("F5", 0x97)],
-            },
-        }
+        return [self._last_data.get(label, 0) for label in CHANNEL_LABELS]
 
     def start_measurement(self):
         """
@@ -367,7 +1040,9 @@ class AS7343:
         This starts the sensor integration. Call stop_measurement() after an
         appropriate delay to complete the measurement.
         """
-        self._write_u8(_ENABLE, _ENABLE_WEN | _ENABLE_SP_EN | _ENABLE_PON)
+        self._write_u8(
+            _ENABLE, self._enable_extra | _ENABLE_WEN | _ENABLE_SP_EN | _ENABLE_PON
+        )
 
     def stop_measurement(self):
         """
@@ -375,7 +1050,7 @@ class AS7343:
 
         This stops sensor integration and makes the data available for reading.
         """
-        self._write_u8(_ENABLE, _ENABLE_PON)
+        self._write_u8(_ENABLE, self._enable_extra | _ENABLE_PON)
 
     def read_smux_mode(self, mode_name):
         """
@@ -386,12 +1061,320 @@ class AS7343:
         :param mode_name: One of the SMUX_* constants
         :return: Dictionary of channel labels mapping to values
         """
-        self.set_smux_mode(mode_name)
-        mapping = self.get_smux_map(mode_name)
+        return self.read_smux_config(mode_name, self.get_smux_map(mode_name))
+
+    def read_smux_config(self, config, label_map):
+        """
+        Run one measurement cycle with any SMUX configuration.
+
+        This is the building block for reading arbitrary channel subsets (see
+        :mod:`as7343.smux`), where the SMUX image is computed rather than one of
+        the predefined modes.
+
+        :param config: One of the SMUX_* constants, or a 20-byte SMUX image
+        :param label_map: Sequence of (label, register_address) pairs to read
+        :return: Dictionary of channel labels mapping to values
+        """
+        self.load_smux(config)
+        return self.measure(label_map)
+
+    def load_smux(self, config):
+        """
+        Load a SMUX configuration without measuring.
+
+        :param config: One of the SMUX_* constants, or a 20-byte SMUX image
+        :raises ValueError: If an invalid mode name is provided
+        """
+        if isinstance(config, str):
+            self.set_smux_mode(config)
+        else:
+            self._write_smux(config)
+
+    def measure(self, label_map):
+        """
+        Run one measurement cycle with the SMUX configuration already loaded.
+
+        Useful for repeated exposures of the same channel set (for example at
+        different gains) without rewriting the SMUX registers.
+
+        :param label_map: Sequence of (label, register_address) pairs to read
+        :return: Dictionary of channel labels mapping to values
+        """
         self.start_measurement()
-        time.sleep(0.25)
+        self._wait_for_data(0.25)
         self.stop_measurement()
-        return {label: self._read_u16(reg) for label, reg in mapping}
+        return self.read_channels(label_map)
+
+    def read_channels(self, label_map, out=None):
+        """
+        Read the data registers of a completed measurement cycle.
+
+        Dark subtraction is applied as for read_all().
+
+        :param label_map: Sequence of (label, register_address) pairs to read
+        :param out: Optional dictionary to fill instead of a new one; only the
+            labels in label_map are written
+        :return: Dictionary of channel labels mapping to values
+        """
+        if out is None:
+            out = {}
+        dark = None
+        if self._dark_subtraction:
+            dark = self._dark_frames.get((self._gain, self._integration_time_us))
+        for label, reg in label_map:
+            val = self._read_u16(reg)
+            if dark is not None:
+                offset = dark.get(label, 0)
+                val = val - offset if val > offset else 0
+            out[label] = val
+        return out
+
+    @property
+    def data_ready(self):
+        """
+        Whether the current measurement cycle has valid data (STATUS2 AVALID).
+
+        :return: True if new spectral data is available
+        """
+        return bool(self._read_u8(_STATUS2) & _AVALID)
+
+    @property
+    def auto_zero_frequency(self):
+        """
+        How often the ADC auto-zero offset calibration runs.
+
+        Auto-zero costs time on every measurement it runs on. ``0`` disables it,
+        ``1``-``254`` runs it every N measurement cycles, and ``255`` runs it
+        only before the first measurement after enabling.
+
+        :return: Current AZ_CONFIG value (0-255)
+        """
+        return self._read_u8(_AZ_CONFIG)
+
+    @auto_zero_frequency.setter
+    def auto_zero_frequency(self, value):
+        """
+        Set how often the ADC auto-zero offset calibration runs.
+
+        :param value: Auto-zero interval in measurement cycles (0-255)
+        :raises ValueError: If the value is out of range
+        """
+        if value not in range(0, 256):
+            raise ValueError("Invalid auto-zero frequency.")
+        self._write_u8(_AZ_CONFIG, value)
+        self._az_config = value
+
+    @property
+    def dark_subtraction(self):
+        """
+        Whether a matching dark frame is subtracted from each reading.
+
+        Subtraction only happens when a dark frame has been captured for the
+        current gain and integration time (see :meth:`capture_dark_frame`).
+
+        :return: True if dark subtraction is enabled
+        """
+        return self._dark_subtraction
+
+    @dark_subtraction.setter
+    def dark_subtraction(self, enable):
+        """
+        Enable or disable automatic dark frame subtraction.
+
+        :param enable: True to subtract matching dark frames, False for raw counts
+        """
+        self._dark_subtraction = bool(enable)
+
+    def capture_dark_frame(self, samples=4):
+        """
+        Capture an averaged dark frame for the current gain and integration time.
+
+        Cover the sensor before calling this. The frame is cached so that later
+        readings at the same settings have it subtracted automatically.
+
+        :param samples: Number of full scans to average (default: 4)
+        :return: Dictionary of averaged dark counts per channel
+        :raises ValueError: If samples is less than 1
+        """
+        if samples < 1:
+            raise ValueError("At least one sample is required.")
+        totals = {}
+        for _ in range(samples):
+            for label, val in self._read_all_raw().items():
+                totals[label] = totals.get(label, 0) + val
+        dark = {
+            label: (total + samples // 2) // samples for label, total in totals.items()
+        }
+        self.set_dark_frame(dark)
+        return dark
+
+    def set_dark_frame(self, dark, gain=None, integration_time=None):
+        """
+        Store a dark frame, for example one saved from an earlier session.
+
+        :param dark: Dictionary of dark counts per channel label
+        :param gain: Gain the frame belongs to (default: current gain)
+        :param integration_time: Integration time in microseconds the frame
+            belongs to (default: current integration time)
+        """
+        if gain is None:
+            gain = self._gain
+        if integration_time is None:
+            integration_time = self._integration_time_us
+        key = (gain, integration_time)
+        if key in self._dark_frames:
+            self._dark_keys.remove(key)
+        elif len(self._dark_keys) >= _DARK_CACHE_SIZE:
+            del self._dark_frames[self._dark_keys.pop(0)]
+        self._dark_frames[key] = dark
+        self._dark_keys.append(key)
+
+    def get_dark_frame(self, gain=None, integration_time=None):
+        """
+        Return the cached dark frame for a gain and integration time.
+
+        :param gain: Gain setting (default: current gain)
+        :param integration_time: Integration time in microseconds (default: current)
+        :return: Dictionary of dark counts, or None if none has been captured
+        """
+        if gain is None:
+            gain = self._gain
+        if integration_time is None:
+            integration_time = self._integration_time_us
+        return self._dark_frames.get((gain, integration_time))
+
+    def clear_dark_frames(self):
+        """Discard all cached dark frames."""
+        self._dark_frames.clear()
+        self._dark_keys.clear()
+
+    def _subtract_dark(self, data):
+        """Subtract the matching dark frame from data in place, clamping at zero."""
+        if not self._dark_subtraction:
+            return
+        dark = self._dark_frames.get((self._gain, self._integration_time_us))
+        if dark is None:
+            return
+        for label, val in data.items():
+            offset = dark.get(label, 0)
+            data[label] = val - offset if val > offset else 0
+
+    @property
+    def flicker_detection(self):
+        """
+        Whether the flicker detection engine is running.
+
+        Flicker detection runs alongside spectral measurements on its own ADC
+        and is left enabled across start_measurement()/stop_measurement().
+
+        :return: True if flicker detection is enabled
+        """
+        return bool(self._enable_extra & _ENABLE_FDEN)
+
+    @flicker_detection.setter
+    def flicker_detection(self, enable):
+        """
+        Enable or disable the flicker detection engine.
+
+        :param enable: True to enable, False to disable flicker detection
+        """
+        if enable:
+            self._enable_extra |= _ENABLE_FDEN
+        else:
+            self._enable_extra &= ~_ENABLE_FDEN
+        self._write_u8(_ENABLE, self._enable_extra | _ENABLE_PON)
+
+    def configure_flicker(self, fd_time=359, fd_gain=GAIN_4X):
+        """
+        Configure the flicker detection integration time and gain.
+
+        Each flicker sample integrates for ``(fd_time + 1) * 2.78`` microseconds,
+        which also sets the raw sample rate (the default of 359 gives ~1 kHz).
+
+        :param fd_time: Flicker integration time in 2.78 us steps (0-2047)
+        :param fd_gain: One of the GAIN_* constants (0x00-0x0C)
+        :raises ValueError: If either value is out of range
+        """
+        if fd_time not in range(0, 2048):
+            raise ValueError("Invalid flicker integration time.")
+        if fd_gain not in range(0x00, 0x0D):
+            raise ValueError("Invalid flicker gain setting.")
+        fd_time = (fd_time & 0xFF, (fd_gain << 3) | (fd_time >> 8))
+        with self.batch():
+            self._write_u8(_FD_TIME_1, fd_time[0])
+            self._write_u8(_FD_TIME_2, fd_time[1])
+        self._fd_time = fd_time
+
+    @property
+    def flicker_sample_rate(self):
+        """
+        The raw flicker sample rate implied by the current FD_TIME setting.
+
+        :return: Sample rate in Hz
+        """
+        fd_time = self._read_u8(_FD_TIME_1) | ((self._read_u8(_FD_TIME_2) & 0x07) << 8)
+        return 1000000 / ((fd_time + 1) * _FD_STEP_US)
+
+    @property
+    def flicker_status(self):
+        """
+        The result of the built-in 100 Hz / 120 Hz flicker detection.
+
+        Reading the status also clears the latched detection flags.
+
+        :return: One of FLICKER_NONE, FLICKER_100HZ, FLICKER_120HZ or FLICKER_UNKNOWN
+        """
+        status = self._read_u8(_FD_STATUS)
+        self._write_u8(_FD_STATUS, status & 0x3C)  # Write 1 to clear latched flags
+        if status & _FD_SATURATION or not status & _FD_MEASUREMENT_VALID:
+            return FLICKER_UNKNOWN
+        if status & _FD_100HZ_VALID and status & _FD_100HZ:
+            return FLICKER_100HZ
+        if status & _FD_120HZ_VALID and status & _FD_120HZ:
+            return FLICKER_120HZ
+        if status & (_FD_100HZ_VALID | _FD_120HZ_VALID):
+            return FLICKER_NONE
+        return FLICKER_UNKNOWN
+
+    def read_flicker_samples(self, buffer, timeout=2.0):
+        """
+        Capture raw flicker samples at the full flicker sample rate.
+
+        Routes the flicker ADC into the FIFO and drains it in bulk reads until
+        ``buffer`` is full. Use :mod:`as7343.flicker` to estimate the dominant
+        frequency and modulation depth from the result.
+
+        :param buffer: Preallocated ``array('H')`` (or list) to fill with samples
+        :param timeout: Maximum capture time in seconds (default: 2.0)
+        :return: Number of samples captured (less than ``len(buffer)`` on timeout)
+        """
+        chunk = bytearray(2 * _FIFO_CHUNK)
+        count = 0
+        total = len(buffer)
+        fd_cfg0 = self._read_u8(_FD_CFG0)
+        with self.batch():
+            self._write_u8(_FD_CFG0, fd_cfg0 | _FD_FIFO_WRITE)
+            self._write_u8(_CONTROL, _CONTROL_FIFO_CLR)
+            self._write_u8(_ENABLE, self._enable_extra | _ENABLE_FDEN | _ENABLE_PON)
+        period = 1 / self.flicker_sample_rate
+        deadline = time.monotonic() + timeout
+        try:
+            while count < total and time.monotonic() < deadline:
+                level = min(self._read_u8(_FIFO_LVL), _FIFO_CHUNK, total - count)
+                if not level:
+                    time.sleep(period)  # Wait for the next sample
+                    continue
+                # Not retried: a repeated burst after a partial read would
+                # silently drop or duplicate samples
+                self._read_into(_FDATA, chunk, 2 * level, retry=False)
+                for i in range(level):
+                    buffer[count + i] = chunk[2 * i] | (chunk[2 * i + 1] << 8)
+                count += level
+        finally:
+            with self.batch():
+                self._write_u8(_ENABLE, self._enable_extra | _ENABLE_PON)
+                self._write_u8(_FD_CFG0, fd_cfg0 & ~_FD_FIFO_WRITE)
+        return count
 
     def enable_low_power_mode(self, enable=True):
         """
@@ -401,9 +1384,11 @@ class AS7343:
 
         :param enable: True to enable, False to disable low power mode
         """
-        cfg0 = self._read_u8(_CFG0)
-        cfg0 |= _LOW_POWER_BIT if enable else cfg0 & ~_LOW_POWER_BIT
-        self._write_u8(_CFG0, cfg0)
+        if enable:
+            self._cfg0 |= _LOW_POWER_BIT
+        else:
+            self._cfg0 &= ~_LOW_POWER_BIT
+        self._write_u8(_CFG0, self._cfg0)
 
     def enable_sleep_after_interrupt(self, enable=True):
         """
@@ -413,9 +1398,10 @@ class AS7343:
 
         :param enable: True to enable, False to disable SAI
         """
-        cfg3 = self._read_u8(_CFG3)
-        cfg3 |= _SAI_BIT if enable else cfg3 & ~_SAI_BIT
+        cfg3 = self._read_u8(_CFG3) if self._cfg3 is None else self._cfg3
+        cfg3 = cfg3 | _SAI_BIT if enable else cfg3 & ~_SAI_BIT
         self._write_u8(_CFG3, cfg3)
+        self._cfg3 = cfg3
 
     def clear_sleep_active(self):
         """Clear the Sleep After Interrupt active status."""
@@ -441,10 +1427,71 @@ class AS7343:
         """
         Wake up the device from shutdown.
 
-        This restores power to the device but does not start measurements.
+        This restores power to the device and reapplies the current
+        configuration (see restore_config()), but does not start measurements.
+        """
+        self._write_u8(_ENABLE, self._enable_extra | _ENABLE_PON)
+        time.sleep(_WAKE_SETTLE)
+        self.restore_config()
+
+    def set_spectral_threshold(self, low, high, adc=0, persistence=1):
+        """
+        Program the hardware spectral threshold interrupt.
+
+        The chip compares one ADC of the current SMUX cycle against the window
+        and raises an interrupt when the value falls below ``low`` or rises
+        above ``high`` for ``persistence`` consecutive cycles. This lets the
+        sensor watch a channel (and wake the host through INT or SAI) without
+        I2C polling.
+
+        :param low: Low threshold in counts (0-65535)
+        :param high: High threshold in counts (0-65535)
+        :param adc: ADC index (0-5) of the current SMUX cycle to watch
+        :param persistence: Consecutive out-of-window cycles required (1-60,
+            default: 1); counts above 3 are rounded up to a multiple of 5
+        :raises ValueError: If any argument is out of range
+        """
+        if not 0 <= low <= high <= 0xFFFF:
+            raise ValueError("Invalid threshold window.")
+        if adc not in range(0, 6):
+            raise ValueError("Invalid ADC channel.")
+        # APERS 0 interrupts on every cycle whatever the window, so it is
+        # not accepted
+        if not 1 <= persistence <= 60:
+            raise ValueError("Invalid persistence count.")
+        if persistence > 3:
+            # APERS codes above 3 count in steps of 5 cycles
+            persistence = min(15, 3 + (persistence + 4) // 5)
+        intenab = self._read_u8(_INTENAB) if self._intenab is None else self._intenab
+        with self.batch():
+            self._write_u16(_SP_TH_L, low)
+            self._write_u16(_SP_TH_H, high)
+            self._write_u8(_PERS, persistence)
+            self._write_u8(_CFG0, self._cfg0 | _REG_BANK)
+            self._write_u8(_CFG12, adc)
+            self._write_u8(_CFG0, self._cfg0)
+            self._write_u8(_INTENAB, intenab | _SP_IEN)
+        self._threshold = (low, high, persistence, adc)
+        self._intenab = intenab | _SP_IEN
+
+    def disable_spectral_threshold(self):
+        """Disable the hardware spectral threshold interrupt."""
+        intenab = self._read_u8(_INTENAB) if self._intenab is None else self._intenab
+        self._write_u8(_INTENAB, intenab & ~_SP_IEN)
+        self._intenab = intenab & ~_SP_IEN
+
+    @property
+    def spectral_interrupt(self):
+        """
+        Whether the spectral threshold interrupt has fired.
+
+        :return: True if the watched channel left the threshold window
         """
-        self._write_u8(_ENABLE, _ENABLE_PON)
-        time.sleep(0.01)
+        return bool(self._read_u8(_STATUS) & _STATUS_AINT)
+
+    def clear_spectral_interrupt(self):
+        """Clear a pending spectral threshold interrupt."""
+        self._write_u8(_STATUS, _STATUS_AINT)
 
     def check_thresholds(self, threshold, data=None):
         """
@@ -472,26 +1519,147 @@ class AS7343:
     # Low-level register I/O methods
     # ------------------------------------------------
 
+    def _retry(self, operation, *args):
+        """Run a bus operation, retrying failures with bounded backoff."""
+        delay = _RETRY_DELAY
+        attempt = 0
+        while True:
+            try:
+                return operation(*args)
+            except OSError:
+                self._i2c_errors += 1
+                if attempt >= self._max_retries:
+                    raise
+            attempt += 1
+            self._retries += 1
+            time.sleep(delay)
+            delay = min(delay * 2, _RETRY_MAX_DELAY)
+
+    def _transfer(self, out_buf, in_buf=None, in_end=None):
+        """Write out_buf, then read into in_buf if given, in one transaction."""
+        with self.i2c_device as i2c:
+            if in_buf is None:
+                i2c.write(out_buf)
+            elif in_end is None:
+                i2c.write_then_readinto(out_buf, in_buf)
+            else:
+                i2c.write_then_readinto(out_buf, in_buf, in_end=in_end)
+
+    def _write_many(self, buffers):
+        """Send several writes while holding the bus once."""
+        with self.i2c_device as i2c:
+            for buf in buffers:
+                i2c.write(buf)
+
+    def batch(self):
+        """
+        Collect register writes and send them in as few transfers as possible.
+
+        Inside ``with sensor.batch():`` register writes are queued. On exit
+        they are sent while holding the bus once: writes to neighbouring
+        registers are merged into one auto-increment transfer (later writes to
+        the same register win), while writes to order-sensitive registers
+        (CFG0, ENABLE, CONTROL, INTENAB and status registers) stay in program
+        order. Reads of a queued register return the queued value; reads of
+        any other register send the queue first. Batches nest, and compound
+        driver operations (SMUX loads, configuration restore, thresholds)
+        already use one. If the block raises, the writes still queued are
+        discarded and CFG0 is restored to its tracked value.
+
+        :return: Context manager yielding the sensor
+        """
+        return self._batch_context
+
+    def _pending_value(self, reg):
+        """Return the last queued value of a register, or None."""
+        if reg in _COMMAND_REGISTERS:
+            return None
+        for pending_reg, value in reversed(self._pending):
+            if pending_reg == reg:
+                return value
+            if pending_reg == _CFG0:
+                return None  # Earlier writes may have gone to another bank
+        return None
+
+    def _flush(self):
+        """Send the queued writes, merging runs of neighbouring registers."""
+        writes = self._pending
+        if not writes:
+            return
+        self._pending = []
+        buffers = []
+        i = 0
+        while i < len(writes):
+            reg, value = writes[i]
+            i += 1
+            if reg in _ORDERED_REGISTERS:
+                buffers.append(bytes([reg, value]))
+                continue
+            segment = {reg: value}
+            while i < len(writes) and writes[i][0] not in _ORDERED_REGISTERS:
+                segment[writes[i][0]] = writes[i][1]
+                i += 1
+            regs = sorted(segment)
+            start = 0
+            while start < len(regs):
+                end = start + 1
+                while end < len(regs) and regs[end] == regs[end - 1] + 1:
+                    end += 1
+                buffers.append(
+                    bytes([regs[start]] + [segment[r] for r in regs[start:end]])
+                )
+                start = end
+        self._retry(self._write_many, buffers)
+
+    def _read_into(self, reg, buf, end=None, retry=True):
+        """Read consecutive registers into buf, sending queued writes first."""
+        if self._pending:
+            self._flush()
+        if retry:
+            self._retry(self._transfer, bytes([reg]), buf, end)
+            return
+        try:
+            self._transfer(bytes([reg]), buf, end)
+        except OSError:
+            self._i2c_errors += 1
+            raise
+
     def _read_u8(self, reg):
         """Read an 8-bit unsigned value from the specified register."""
+        if self._pending:
+            value = self._pending_value(reg)
+            if value is not None:
+                return value
+            self._flush()
         buf = bytearray(1)
-        with self.i2c_device as i2c:
-            i2c.write_then_readinto(bytes([reg]), buf)
+        self._retry(self._transfer, bytes([reg]), buf)
         return buf[0]
 
     def _write_u8(self, reg, value):
         """Write an 8-bit unsigned value to the specified register."""
-        with self.i2c_device as i2c:
-            i2c.write(bytes([reg, value]))
+        if self._pending is not None:
+            self._pending.append((reg, value & 0xFF))
+            if reg == _CFG0:
+                self._batch_cfg0 = True
+            return
+        self._retry(self._transfer, bytes([reg, value]))
 
     def _read_u16(self, reg):
         """Read a 16-bit little-endian unsigned value from the specified register."""
+        if self._pending:
+            low = self._pending_value(reg)
+            high = self._pending_value(reg + 1)
+            if low is not None and high is not None:
+                return low | (high << 8)
+            self._flush()
         buf = bytearray(2)
-        with self.i2c_device as i2c:
-            i2c.write_then_readinto(bytes([reg]), buf)
+        self._retry(self._transfer, bytes([reg]), buf)
         return struct.unpack("<H", buf)[0]
 
     def _write_u16(self, reg, value):
         """Write a 16-bit little-endian unsigned value to the specified register."""
-        with self.i2c_device as i2c:
-            i2c.write(struct.pack("<BH", reg, value))
\ No newline at end of file
+        if self._pending is not None:
+            self._pending.append((reg, value & 0xFF))
+            self._pending.append((reg + 1, (value >> 8) & 0xFF))
+            return
+        self._retry(self._transfer, struct.pack("<BH", reg, value))